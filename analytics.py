@@ -0,0 +1,399 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  analytics.py
+#
+# DESCRIPTION
+#    This code analyzes the run logs written by run_log.py. A log is loaded
+#    as a memory-mapped NumPy structured array, so even logs with millions of
+#    samples are not copied into memory, and every metric is computed with
+#    whole-array operations instead of Python loops.
+#
+#    Running this file summarizes a run:
+#
+#        python analytics.py run.log
+#
+# NOTES
+#    The car position is dead reckoned from the motor duty cycles, so it is
+#    only as good as WHEEL_SPEED_AT_FULL_DUTY and WHEEL_BASE. Measure them on
+#    the car for better paths.
+#
+#    A log can hold many sessions. A new session starts at a session marker
+#    record, or wherever the time goes backward (a reboot) or jumps by more
+#    than MAX_TICK_GAP (a log written before the markers). The time between
+#    sessions is not counted anywhere.
+#
+# *****************************************************************************
+
+import argparse
+import os
+import numpy as np
+
+# Must match RECORD_FORMAT in run_log.py
+LOG_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("duty1", "<f4"),
+    ("duty2", "<f4"),
+    ("direction", "i1"),
+    ("ir1", "u1"),
+    ("ir2", "u1"),
+    ("distance", "<f4"),
+])
+
+WHEEL_SPEED_AT_FULL_DUTY = 50.0  # cm/s
+WHEEL_BASE = 13.0  # cm
+FULL_DUTY = 100.0
+SENSED_BLACK = 1
+SESSION_MARKER = 0  # must match run_log.py
+MAX_TICK_GAP = 1.0  # s
+DISTANCE_BINS = 22
+MAX_DISTANCE = 220  # cm
+PERCENT = 100
+FULL_TURN = 360  # deg
+MILLISECONDS = 1000
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function loads a run log as a memory-mapped structured array. A
+#   partly written record at the end of the file is left out.
+#
+# INPUT PARAMETERS:
+#   path - the path of the run log
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the structured array of records, read only
+# -----------------------------------------------------------------------------
+
+
+def load_run(path):
+    count = os.path.getsize(path) // LOG_DTYPE.itemsize
+    if (count == 0):
+        return np.zeros(0, dtype=LOG_DTYPE)
+    return np.memmap(path, dtype=LOG_DTYPE, mode="r", shape=(count,))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function finds where the sessions in a log start.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   an array that is True for every record that starts a session or is a
+#   session marker
+# -----------------------------------------------------------------------------
+
+
+def session_breaks(run):
+    t = run["t"]
+    marker = run["direction"] == SESSION_MARKER
+    breaks = marker.copy()
+    if (len(t) > 0):
+        breaks[0] = True
+        gap = np.diff(t)
+        breaks[1:] |= marker[:-1] | (gap <= 0) | (gap > MAX_TICK_GAP)
+    return breaks
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns how long each sample was held, which is the time to
+#   the next sample. The last sample of each session and the session markers
+#   are held for no time.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the hold time of every sample in seconds
+# -----------------------------------------------------------------------------
+
+
+def hold_times(run):
+    t = run["t"]
+    if (len(t) == 0):
+        return np.zeros(0)
+    dt = np.diff(t, append=t[-1])
+    breaks = session_breaks(run)
+    dt[:-1][breaks[1:]] = 0.0
+    return dt
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function counts the sessions in a log that have samples in them.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the number of sessions
+# -----------------------------------------------------------------------------
+
+
+def session_count(run):
+    marker = run["direction"] == SESSION_MARKER
+    return int((session_breaks(run) & ~marker).sum())
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function dead reckons the path of the car from the motor duty
+#   cycles, treating the car as a differential drive with motor 1 on the
+#   left and motor 2 on the right.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#   wheel_speed - the wheel speed at full duty in cm/s
+#   wheel_base - the distance between the wheels in cm
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the x and y positions in cm and the heading in radians after each sample
+# -----------------------------------------------------------------------------
+
+
+def dead_reckoning(run, wheel_speed=WHEEL_SPEED_AT_FULL_DUTY,
+                   wheel_base=WHEEL_BASE):
+    dt = hold_times(run)
+    scale = run["direction"] * (wheel_speed / FULL_DUTY)
+    left = run["duty1"] * scale
+    right = run["duty2"] * scale
+    heading = np.cumsum((right - left) / wheel_base * dt)
+    # Move along the heading at the start of each sample
+    start_heading = heading - (right - left) / wheel_base * dt
+    step = (left + right) / 2 * dt
+    x = np.cumsum(step * np.cos(start_heading))
+    y = np.cumsum(step * np.sin(start_heading))
+    return x, y, heading
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function works out how much of the run the car spent on the line.
+#   The car is centered when neither sensor sees black, correcting when one
+#   does, and lost when both do.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the percentage of time in each state
+# -----------------------------------------------------------------------------
+
+
+def line_stats(run):
+    dt = hold_times(run)
+    total = dt.sum()
+    if (total <= 0):
+        return {"centered": 0.0, "correcting_left": 0.0,
+                "correcting_right": 0.0, "lost": 0.0}
+    left = run["ir1"] == SENSED_BLACK
+    right = run["ir2"] == SENSED_BLACK
+    return {
+        "centered": dt[~left & ~right].sum() / total * PERCENT,
+        "correcting_left": dt[left & ~right].sum() / total * PERCENT,
+        "correcting_right": dt[right & ~left].sum() / total * PERCENT,
+        "lost": dt[left & right].sum() / total * PERCENT,
+    }
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes a histogram of the ultrasonic distances. Samples with
+#   no distance measured are left out.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#   bins - the number of bins
+#   max_distance - the largest distance in cm
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the count in each bin and the bin edges in cm
+# -----------------------------------------------------------------------------
+
+
+def distance_histogram(run, bins=DISTANCE_BINS, max_distance=MAX_DISTANCE):
+    distance = run["distance"]
+    return np.histogram(distance[distance > 0], bins=bins,
+                        range=(0, max_distance))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function measures the control tick timing, from the time between
+#   samples.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the tick period statistics in milliseconds
+# -----------------------------------------------------------------------------
+
+
+def tick_jitter(run):
+    ticks = np.diff(run["t"])[~session_breaks(run)[1:]] * MILLISECONDS
+    if (len(ticks) == 0):
+        return {"mean": 0.0, "std": 0.0, "p50": 0.0, "p99": 0.0,
+                "max": 0.0}
+    p50, p99 = np.percentile(ticks, [50, 99])
+    return {
+        "mean": float(ticks.mean()),
+        "std": float(ticks.std()),
+        "p50": float(p50),
+        "p99": float(p99),
+        "max": float(ticks.max()),
+    }
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function summarizes a run.
+#
+# INPUT PARAMETERS:
+#   run - the run records
+#   wheel_speed - the wheel speed at full duty in cm/s
+#   wheel_base - the distance between the wheels in cm
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the run metrics
+# -----------------------------------------------------------------------------
+
+
+def summarize(run, wheel_speed=WHEEL_SPEED_AT_FULL_DUTY,
+              wheel_base=WHEEL_BASE):
+    summary = {"samples": len(run), "sessions": 0, "duration": 0.0}
+    if (len(run) == 0):
+        return summary
+    summary["samples"] = int((run["direction"] != SESSION_MARKER).sum())
+    summary["sessions"] = session_count(run)
+    summary["duration"] = float(hold_times(run).sum())
+    x, y, heading = dead_reckoning(run, wheel_speed, wheel_base)
+    summary["path_length"] = float(
+        np.hypot(np.diff(x, prepend=0), np.diff(y, prepend=0)).sum())
+    summary["end_position"] = (float(x[-1]), float(y[-1]))
+    summary["end_heading"] = float(np.degrees(heading[-1]))
+    summary["line"] = line_stats(run)
+    summary["tick"] = tick_jitter(run)
+    summary["distance_histogram"] = distance_histogram(run)
+    return summary
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function wraps a heading to -180 up to 180 degrees. The dead
+#   reckoned heading keeps adding up lap after lap.
+#
+# INPUT PARAMETERS:
+#   heading - the heading in degrees
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the heading from -180 up to but not including 180 degrees
+# -----------------------------------------------------------------------------
+
+
+def wrap_heading(heading):
+    return (heading + FULL_TURN / 2) % FULL_TURN - FULL_TURN / 2
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function prints a run summary.
+#
+# INPUT PARAMETERS:
+#   summary - the run summary from summarize
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def print_summary(summary):
+    print("Samples:   %d in %d sessions" % (summary["samples"],
+                                            summary["sessions"]))
+    print("Duration:  %.2f s" % summary["duration"])
+    if (summary["samples"] == 0):
+        return
+    print("Path:      %.1f cm, ending at (%.1f, %.1f) cm heading %.0f deg" %
+          (summary["path_length"], summary["end_position"][0],
+           summary["end_position"][1], wrap_heading(summary["end_heading"])))
+    line = summary["line"]
+    print("Line:      %.1f%% centered, %.1f%% correcting left, "
+          "%.1f%% correcting right, %.1f%% lost" %
+          (line["centered"], line["correcting_left"],
+           line["correcting_right"], line["lost"]))
+    tick = summary["tick"]
+    print("Tick:      mean %.3f ms, std %.3f ms, p50 %.3f ms, p99 %.3f ms, "
+          "max %.3f ms" % (tick["mean"], tick["std"], tick["p50"],
+                           tick["p99"], tick["max"]))
+    counts, edges = summary["distance_histogram"]
+    if (counts.sum() == 0):
+        print("Distance:  no readings")
+        return
+    print("Distance:")
+    for i in range(len(counts)):
+        if (counts[i] > 0):
+            print("  %5.0f - %5.0f cm  %d" %
+                  (edges[i], edges[i + 1], counts[i]))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that summarizes the run logs given on the
+#   command line.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize PiCar run logs.")
+    parser.add_argument("logs", nargs="+", help="run log files")
+    parser.add_argument("--wheel-speed", type=float,
+                        default=WHEEL_SPEED_AT_FULL_DUTY,
+                        help="wheel speed at full duty in cm/s")
+    parser.add_argument("--wheel-base", type=float, default=WHEEL_BASE,
+                        help="distance between the wheels in cm")
+    args = parser.parse_args()
+    for path in args.logs:
+        print("== %s" % path)
+        print_summary(summarize(load_run(path), args.wheel_speed,
+                                args.wheel_base))
+
+
+# if file execute standalone then call the main function.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  event_bus.py
+#
+# DESCRIPTION
+#    This code is the event bus and the car state for project.py. Commands
+#    from the web page and readings from the sensors are typed events, and
+#    the car state is an immutable snapshot that is swapped for a new one on
+#    every change.
+#
+#    Reading the state is one attribute read of the current snapshot, so a
+#    reader always sees a consistent state without taking a lock. Anything
+#    that wants to follow what the car is doing (telemetry, a UI stream, a
+#    logger) subscribes to the events it cares about. Events are handed to
+#    subscribers on the bus's own thread, so a slow subscriber never holds up
+#    the control loop.
+#
+# *****************************************************************************
+
+import queue
+import threading
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These classes are the events. They only hold values, and are not changed
+#   after they are made.
+# -----------------------------------------------------------------------------
+
+
+class Event:
+    __slots__ = ()
+
+    def __repr__(self):
+        values = ", ".join("%s=%r" % (name, getattr(self, name))
+                           for name in self.__slots__)
+        return "%s(%s)" % (type(self).__name__, values)
+
+
+class SetSpeed(Event):
+    __slots__ = ("speed",)
+
+    def __init__(self, speed):
+        self.speed = speed
+
+
+class SetMode(Event):
+    __slots__ = ("mode",)
+
+    def __init__(self, mode):
+        self.mode = mode
+
+
+class EmergencyStop(Event):
+    __slots__ = ()
+
+
+class Resume(Event):
+    __slots__ = ()
+
+
+class StopMotors(Event):
+    __slots__ = ("reason",)
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+class SensorReading(Event):
+    __slots__ = ("ir_1", "ir_2", "distance")
+
+    def __init__(self, ir_1, ir_2, distance):
+        self.ir_1 = ir_1
+        self.ir_2 = ir_2
+        self.distance = distance
+
+
+class DistanceReading(Event):
+    __slots__ = ("distance",)
+
+    def __init__(self, distance):
+        self.distance = distance
+
+
+class StateChanged(Event):
+    __slots__ = ("state",)
+
+    def __init__(self, state):
+        self.state = state
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a snapshot of the car state. It can't be changed, replace
+#   makes a new snapshot with some of the values changed.
+# -----------------------------------------------------------------------------
+
+
+class CarState:
+    __slots__ = ("mode", "speed", "avoiding_object", "estop_latched",
+                 "motor_pwm1", "motor_pwm2", "duty1", "duty2", "direction",
+                 "distance")
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CarState is immutable, use replace")
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return CarState(**values)
+
+    def as_dict(self):
+        # The PWM handles are left out, they are not values
+        return {name: getattr(self, name) for name in self.__slots__
+                if not name.startswith("motor_pwm")}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the event bus. Publishing only puts the event on a queue,
+#   and only if something subscribed to that type of event. The bus thread
+#   then hands it to the subscribers.
+# -----------------------------------------------------------------------------
+
+
+class EventBus:
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+
+    def subscribe(self, event_type, callback):
+        with self.lock:
+            # Copy on write, so publish can read the dictionary without
+            # the lock.
+            subscribers = dict(self.subscribers)
+            subscribers[event_type] = (subscribers.get(event_type, ()) +
+                                       (callback,))
+            self.subscribers = subscribers
+            if (self.thread is None):
+                self.thread = threading.Thread(target=self.deliver,
+                                               daemon=True)
+                self.thread.start()
+
+    def wants(self, event_type):
+        return event_type in self.subscribers
+
+    def publish(self, event):
+        callbacks = self.subscribers.get(type(event))
+        if (callbacks is not None):
+            self.queue.put((event, callbacks))
+
+    def deliver(self):
+        while True:
+            event, callbacks = self.queue.get()
+            for callback in callbacks:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print("Subscriber %r failed on %r: %s" %
+                          (callback, event, e))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class holds the current car state snapshot. Changes are made one at
+#   a time, each one swapping in a new snapshot and publishing it.
+# -----------------------------------------------------------------------------
+
+
+class StateStore:
+    def __init__(self, state, bus):
+        self.current = state
+        self.bus = bus
+        self.lock = threading.Lock()
+
+    def update(self, **changes):
+        with self.lock:
+            state = self.current.replace(**changes)
+            self.current = state
+            # Publish under the lock, so subscribers get the changes in the
+            # order they were made. It only puts the event on a queue.
+            self.bus.publish(StateChanged(state))
+        return state
@@ -0,0 +1,333 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  loadtest.py
+#
+# DESCRIPTION
+#    This code load tests the PiCar web server. It starts the server on the
+#    simulated GPIO in its own process, then runs a number of simulated
+#    drivers against it at once. Each driver behaves like someone using the
+#    control page: it sends heartbeats, drags the speed slider (which sends
+#    /set_speed on every input event), waits a while, and now and then
+#    presses one of the buttons.
+#
+#    At the end it reports the throughput, the p50/p99 latency, the error
+#    rate, and how many motor commands per second actually reached the
+#    motors.
+#
+#        python loadtest.py --clients 20 --seconds 30
+#
+# NOTES
+#    Latency is measured from when a request was due to be sent, not when it
+#    was sent, so a server that falls behind can't hide it by slowing the
+#    drivers down.
+#
+# *****************************************************************************
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+HOST = "127.0.0.1"
+PORT = 8080
+HEARTBEAT_PERIOD = 0.2
+SLIDER_EVENT_PERIOD = 0.016  # browsers fire input events about every frame
+DRAG_TIME = (0.3, 1.5)
+THINK_TIME = (0.5, 3.0)
+BUTTON_CHANCE = 0.1
+REQUEST_TIMEOUT = 5.0
+SERVER_START_TIMEOUT = 5.0
+MILLISECONDS = 1000
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the server process. It runs the PiCar web server on the
+#   simulated GPIO, and answers requests for the motor command count on the
+#   pipe until it is told to stop.
+#
+# INPUT PARAMETERS:
+#   port - the port to listen on
+#   pipe - the pipe to the load test
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def server_process(port, pipe):
+    os.environ["PICAR_SIMULATE"] = "1"
+    import bottle
+    import project
+    project.setup_gpio()
+    threading.Thread(target=project.heartbeat_watchdog_thread,
+                     daemon=True).start()
+    threading.Thread(target=bottle.run, daemon=True,
+                     kwargs={"server": project.ThreadingWSGIRefServer,
+                             "host": HOST, "port": port,
+                             "quiet": True}).start()
+    while (pipe.recv() == "count"):
+        pipe.send(project.global_motor_commands)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class collects the results of every request from every driver.
+# -----------------------------------------------------------------------------
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = 0
+
+    def add(self, path, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(path, []).append(latency)
+            if (not ok):
+                self.errors += 1
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is one simulated driver. Heartbeats are sent from their own
+#   thread, like the page's timer, while the driver drags the slider and
+#   presses buttons.
+# -----------------------------------------------------------------------------
+
+
+class Driver:
+    def __init__(self, port, results, end_time, seed):
+        self.client = "driver%d" % seed
+        self.port = port
+        self.results = results
+        self.end_time = end_time
+        self.random = random.Random(seed)
+        self.speed = 0
+        self.heartbeat_seq = 0
+
+    def request(self, method, path, body, due):
+        ok = False
+        try:
+            connection = http.client.HTTPConnection(HOST, self.port,
+                                                    timeout=REQUEST_TIMEOUT)
+            connection.request(method, path, body, {
+                "Content-type": "application/x-www-form-urlencoded"})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status == 200
+            connection.close()
+        except (OSError, http.client.HTTPException):
+            pass
+        self.results.add(path, time.perf_counter() - due, ok)
+
+    def sleep_until(self, due):
+        delay = due - time.perf_counter()
+        if (delay > 0):
+            time.sleep(delay)
+
+    def heartbeats(self):
+        due = time.perf_counter()
+        while (due < self.end_time):
+            self.sleep_until(due)
+            self.heartbeat_seq += 1
+            self.request("POST", "/heartbeat",
+                         "client=%s&seq=%d&rtt=-1" %
+                         (self.client, self.heartbeat_seq), due)
+            due += HEARTBEAT_PERIOD
+
+    def drag_slider(self, due):
+        target = self.random.randint(-100, 100)
+        events = max(1, int(self.random.uniform(*DRAG_TIME) /
+                            SLIDER_EVENT_PERIOD))
+        start = self.speed
+        for event in range(1, events + 1):
+            if (due >= self.end_time):
+                break
+            self.sleep_until(due)
+            self.speed = start + (target - start) * event // events
+            self.request("POST", "/set_speed", "client=%s&speed=%d" %
+                         (self.client, self.speed), due)
+            due += SLIDER_EVENT_PERIOD
+        return due
+
+    def press_button(self, due):
+        self.sleep_until(due)
+        # Automatic mode is left out, its own motor commands would swamp the
+        # ones coming from the drivers.
+        if (self.random.random() < 0.5):
+            self.request("POST", "/estop", "", due)
+            self.request("POST", "/resume", "client=" + self.client,
+                         time.perf_counter())
+        else:
+            self.request("POST", "/switch_manual", "client=" + self.client,
+                         due)
+        return time.perf_counter()
+
+    def run(self):
+        heartbeat = threading.Thread(target=self.heartbeats, daemon=True)
+        heartbeat.start()
+        due = time.perf_counter()
+        while (due < self.end_time):
+            if (self.random.random() < BUTTON_CHANCE):
+                due = self.press_button(due)
+            else:
+                due = self.drag_slider(due)
+            due += self.random.uniform(*THINK_TIME)
+        heartbeat.join()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function waits until the server accepts connections.
+#
+# INPUT PARAMETERS:
+#   port - the port of the server
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   True if the server started in time, otherwise False
+# -----------------------------------------------------------------------------
+
+
+def wait_for_server(port):
+    deadline = time.perf_counter() + SERVER_START_TIMEOUT
+    while (time.perf_counter() < deadline):
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=1)
+            connection.request("GET", "/estop_status")
+            connection.getresponse().read()
+            connection.close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns a percentile of a sorted list.
+#
+# INPUT PARAMETERS:
+#   values - the sorted values
+#   percent - the percentile, from 0 to 100
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the percentile, or 0 if there are no values
+# -----------------------------------------------------------------------------
+
+
+def percentile(values, percent):
+    if (len(values) == 0):
+        return 0.0
+    return values[min(len(values) - 1, len(values) * percent // 100)]
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function prints the load test results.
+#
+# INPUT PARAMETERS:
+#   results - the collected results
+#   duration - how long the load test ran in seconds
+#   motor_commands - the number of motor commands drive_motors applied
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def print_results(results, duration, motor_commands):
+    every = sorted(latency for latencies in results.latencies.values()
+                   for latency in latencies)
+    total = len(every)
+    print("Requests:        %d in %.1f s, %.1f req/s" %
+          (total, duration, total / duration))
+    print("Latency:         p50 %.1f ms, p99 %.1f ms, max %.1f ms" %
+          (percentile(every, 50) * MILLISECONDS,
+           percentile(every, 99) * MILLISECONDS,
+           (every[-1] if total else 0) * MILLISECONDS))
+    print("Errors:          %d (%.2f%%)" %
+          (results.errors, results.errors * 100 / max(total, 1)))
+    set_speeds = len(results.latencies.get("/set_speed", []))
+    print("Motor commands:  %.1f /s applied for %.1f /s /set_speed requests" %
+          (motor_commands / duration, set_speeds / duration))
+    for path in sorted(results.latencies):
+        latencies = sorted(results.latencies[path])
+        print("  %-26s %6d  p50 %7.1f ms  p99 %7.1f ms" %
+              (path, len(latencies), percentile(latencies, 50) * MILLISECONDS,
+               percentile(latencies, 99) * MILLISECONDS))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that runs the load test.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the PiCar web server on the simulated GPIO.")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pipe, server_pipe = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=server_process,
+                                     args=(args.port, server_pipe),
+                                     daemon=True)
+    server.start()
+    if (not wait_for_server(args.port)):
+        print("The server did not start on port %d" % args.port)
+        server.terminate()
+        return
+
+    results = Results()
+    pipe.send("count")
+    start_commands = pipe.recv()
+    start = time.perf_counter()
+    end = start + args.seconds
+    drivers = [threading.Thread(target=Driver(args.port, results, end,
+                                              args.seed + i).run)
+               for i in range(args.clients)]
+    for driver in drivers:
+        driver.start()
+    for driver in drivers:
+        driver.join()
+    duration = time.perf_counter() - start
+    pipe.send("count")
+    motor_commands = pipe.recv() - start_commands
+    pipe.send("stop")
+    server.join(1)
+    server.terminate()
+
+    print("Clients:         %d" % args.clients)
+    print_results(results, duration, motor_commands)
+
+
+# if file execute standalone then call the main function.
+if __name__ == '__main__':
+    main()
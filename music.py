@@ -13,9 +13,14 @@
 #
 # *****************************************************************************
 
-import RPi.GPIO as GPIO
+import os
 import time
 
+if (os.environ.get("PICAR_SIMULATE")):
+    import sim_gpio as GPIO
+else:
+    import RPi.GPIO as GPIO
+
 TEMPO_ADJUSTMENT = 0.5
 BUZZER_NOTES = {  # Credit to ChatGPT for these notes
     "B0": 31,
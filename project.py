@@ -28,12 +28,33 @@
 #
 # *****************************************************************************
 
-import RPi.GPIO as GPIO
+import os
+import json
 import time
 import threading
+import multiprocessing
+import signal
 from music import play_jingle_bells
-from bottle import route, run, template, request
+from bottle import route, run, template, request, response, ServerAdapter
 from datetime import datetime
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+from run_log import RunLogger, FORWARD, BACKWARD, DISTANCE_UNKNOWN
+from shared_state import ControlBlock, Command
+from realtime import (enable_realtime, realtime_cpu_from_env,
+                      JitterRecorder, TickTimer)
+from track_map import TrackFollower
+from event_bus import (EventBus, StateStore, CarState, SetSpeed, SetMode,
+                       EmergencyStop, Resume, StopMotors, SensorReading,
+                       DistanceReading)
+from sensors import (IrSensorReader, NO_FILTER, MAJORITY, DEBOUNCE,
+                     DEFAULT_FILTER_SAMPLES)
+
+# Use the simulated GPIO when there is no Raspberry Pi attached
+if (os.environ.get("PICAR_SIMULATE")):
+    import sim_gpio as GPIO
+else:
+    import RPi.GPIO as GPIO
 
 # ---------------------------------------------------
 # Constants to be used in program
@@ -74,13 +95,113 @@ UV_MAXIMUM_DISTANCE = 7
 
 PWM_FREQUENCY = 100
 
-# Globals
-global_speed = 100
-global_mode = "manual"
-global_motor_pwm1 = None
-global_motor_pwm2 = None
+# Inner wheel speed in a turn, as a fraction of the outer wheel speed. 0 turns
+# by stopping the inner wheel.
+STEER_INNER_RATIO = 0.0
+
+# Obstacle avoidance with the ultrasonic sensor in automatic mode. The sensor
+# is read every ULTRASONIC_PERIOD seconds.
+OBSTACLE_AVOIDANCE = bool(os.environ.get("PICAR_OBSTACLE_AVOIDANCE"))
+ULTRASONIC_PERIOD = 0.1
+
+# Tuned settings, written by tuner.py. The file is loaded at start if it
+# exists, PICAR_CONFIG can point to a different file.
+CONFIG_PATH = os.environ.get("PICAR_CONFIG", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "picar_config.json"))
+# The type and the lowest and highest value allowed for each setting
+CONFIG_LIMITS = {
+    "speed": (int, 0, 100),
+    "pwm_frequency": ((int, float), 1, 100000),
+    "uv_maximum_distance": ((int, float), 0, 400),
+    "steer_inner_ratio": ((int, float), 0, 1),
+    "obstacle_avoidance": (bool, False, True),
+}
+CONFIG_KEYS = tuple(CONFIG_LIMITS)
+CONFIG_TYPE_NAMES = {int: "a whole number", (int, float): "a number",
+                     bool: "true or false"}
+
+# Heartbeat settings in seconds. The page sends a heartbeat every period, and
+# the motors are stopped when none arrives within the timeout. The timeout can
+# be changed with the PICAR_HEARTBEAT_TIMEOUT environment variable.
+HEARTBEAT_PERIOD = 0.2
+HEARTBEAT_TIMEOUT = float(os.environ.get("PICAR_HEARTBEAT_TIMEOUT", 1.0))
+HEARTBEAT_CHECK_PERIOD = 0.05
+# Time allowed for the deadman to cut the motors once the check fires
+DEADMAN_STOP_TIME = 0.005
+RTT_MEAN_GAIN = 1 / 8
+RTT_JITTER_GAIN = 1 / 16
+MILLISECONDS = 1000
+# Every open control page is a client with its own link. Requests without a
+# client id share the default link, and links not heard from in a while are
+# forgotten.
+DEFAULT_CLIENT = ""
+LINK_FORGET_TIME = 60.0
+
+# Control loop settings in seconds. The automatic mode runs at a fixed tick.
+# Setting PICAR_ISOLATED_CONTROLLER runs the control loop in its own process,
+# and PICAR_REALTIME turns on the real-time settings for it.
+CONTROL_TICK_PERIOD = 0.002
+CONTROLLER_ACK_TIMEOUT = 0.1
+# The controller checks every period that the web server is still its parent,
+# and stops the car if it is gone. On shutdown the web server waits this long
+# for the controller to exit.
+PARENT_CHECK_PERIOD = 0.05
+CONTROLLER_EXIT_TIMEOUT = 1.0
+
+# Globals. The automatic mode thread is started and joined by concurrent
+# request handlers, the lock makes sure there is only ever one.
+global_automatic_lock = threading.Lock()
 global_automatic_thread = None
-global_avoiding_object = False
+
+# Car state. Commands and sensor readings are events on the bus, and the state
+# is an immutable snapshot that the store swaps for a new one on every change,
+# so global_state.current is always a consistent view without a lock.
+global_bus = EventBus()
+global_state = StateStore(CarState(
+    mode="manual", speed=100, avoiding_object=False, estop_latched=False,
+    motor_pwm1=None, motor_pwm2=None, duty1=0, duty2=0, direction=FORWARD,
+    distance=DISTANCE_UNKNOWN), global_bus)
+
+# Infrared sensor reader, read once per control tick. PICAR_IR_FILTER can be
+# set to "majority" or "debounce" to filter the readings over the last
+# PICAR_IR_FILTER_SAMPLES samples.
+global_ir_reader = None
+
+# The run log is turned on by setting PICAR_RUN_LOG to the path of the log
+# file.
+global_run_logger = None
+
+# Shared memory block to the controller process, only in isolated mode
+global_control_block = None
+global_command_lock = threading.Lock()
+
+# Wake-up error of the control ticks
+global_jitter_recorder = JitterRecorder()
+
+# Learned track map and speed profile, turned on by setting PICAR_TRACK_MAP
+# to the path the map is cached at.
+global_track_follower = None
+
+# Emergency stop state. The latch is checked by every motor command, and the
+# motor lock makes sure no command can sneak in after the stop was applied.
+global_motor_lock = threading.Lock()
+# Motor commands applied, the ones that got past the latch
+global_motor_commands = 0
+# The stop counts and latencies are updated by concurrent request handlers
+global_estop_lock = threading.Lock()
+global_estop_count = 0
+global_estop_unconfirmed = 0
+global_estop_last_latency = 0.0
+global_estop_max_latency = 0.0
+
+# Heartbeat state, one link per client. The deadman watches the driving
+# client, the last one that sent a drive command, and is only armed once its
+# first heartbeat arrives. Other open pages don't keep the car going.
+global_link_lock = threading.Lock()
+global_links = {}
+global_driver = DEFAULT_CLIENT
+global_deadman_trips = 0
+global_deadman_last_detection = 0.0
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -98,8 +219,7 @@ global_avoiding_object = False
 
 
 def setup_gpio():
-    global global_motor_pwm1
-    global global_motor_pwm2
+    global global_ir_reader
     # Use Broadcom SOC Pin numbers
     GPIO.setmode(GPIO.BCM)
     # Set up the GPIO Pins
@@ -119,11 +239,26 @@ def setup_gpio():
     GPIO.setup(TRIG_PIN, GPIO.OUT)
     GPIO.setup(ECHO_PIN, GPIO.IN)
 
-    global_motor_pwm1 = GPIO.PWM(ENABLE_1_PIN, PWM_FREQUENCY)
-    global_motor_pwm2 = GPIO.PWM(ENABLE_2_PIN, PWM_FREQUENCY)
-
-    global_motor_pwm1.start(0)
-    global_motor_pwm2.start(0)
+    motor_pwm1 = GPIO.PWM(ENABLE_1_PIN, PWM_FREQUENCY)
+    motor_pwm2 = GPIO.PWM(ENABLE_2_PIN, PWM_FREQUENCY)
+
+    motor_pwm1.start(0)
+    motor_pwm2.start(0)
+
+    ir_filter = os.environ.get("PICAR_IR_FILTER") or NO_FILTER
+    if (ir_filter not in (NO_FILTER, MAJORITY, DEBOUNCE)):
+        raise ValueError("PICAR_IR_FILTER must be %s or %s" %
+                         (MAJORITY, DEBOUNCE))
+    samples = int(os.environ.get("PICAR_IR_FILTER_SAMPLES",
+                                 DEFAULT_FILTER_SAMPLES))
+    if (samples < 1):
+        raise ValueError("PICAR_IR_FILTER_SAMPLES must be at least 1")
+    global_ir_reader = IrSensorReader(
+        GPIO, IR_SENSOR_1_PIN, IR_SENSOR_2_PIN,
+        use_registers=not os.environ.get("PICAR_SIMULATE"),
+        filter_type=ir_filter, samples=samples)
+    global_state.update(motor_pwm1=motor_pwm1, motor_pwm2=motor_pwm2,
+                        duty1=0, duty2=0)
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -188,6 +323,40 @@ def setup_move_backward():
 def set_motor_speed(pwm, speed):
     pwm.ChangeDutyCycle(speed)
 
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function applies a motor command, unless the emergency stop is
+#   latched. All of the move functions go through here.
+#
+# INPUT PARAMETERS:
+#   setup - the function that sets up the direction pins
+#   speed1 - the speed of motor 1
+#   speed2 - the speed of motor 2
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def drive_motors(setup, speed1, speed2):
+    global global_motor_commands
+    with global_motor_lock:
+        state = global_state.current
+        if (state.estop_latched):
+            return
+        global_motor_commands += 1
+        setup()
+        set_motor_speed(state.motor_pwm1, speed1)
+        set_motor_speed(state.motor_pwm2, speed2)
+        direction = BACKWARD if setup is setup_move_backward else FORWARD
+        if (speed1 != state.duty1 or speed2 != state.duty2 or
+                direction != state.direction):
+            global_state.update(duty1=speed1, duty2=speed2,
+                                direction=direction)
+
 # -----------------------------------------------------------------------------
 # DESCRIPTION
 #   This function makes both motors move forward
@@ -205,11 +374,7 @@ def set_motor_speed(pwm, speed):
 
 
 def move_forward(speed):
-    global global_motor_pwm1
-    global global_motor_pwm2
-    setup_move_forward()
-    set_motor_speed(global_motor_pwm1, speed)
-    set_motor_speed(global_motor_pwm2, speed)
+    drive_motors(setup_move_forward, speed, speed)
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -227,11 +392,7 @@ def move_forward(speed):
 
 
 def move_backward(speed):
-    global global_motor_pwm1
-    global global_motor_pwm2
-    setup_move_backward()
-    set_motor_speed(global_motor_pwm1, speed)
-    set_motor_speed(global_motor_pwm2, speed)
+    drive_motors(setup_move_backward, speed, speed)
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -249,11 +410,7 @@ def move_backward(speed):
 
 
 def move_left(speed):
-    global global_motor_pwm1
-    global global_motor_pwm2
-    setup_move_forward()
-    set_motor_speed(global_motor_pwm1, 0)
-    set_motor_speed(global_motor_pwm2, speed)
+    drive_motors(setup_move_forward, speed * STEER_INNER_RATIO, speed)
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -271,11 +428,29 @@ def move_left(speed):
 
 
 def move_right(speed):
-    global global_motor_pwm1
-    global global_motor_pwm2
-    setup_move_forward()
-    set_motor_speed(global_motor_pwm1, speed)
-    set_motor_speed(global_motor_pwm2, 0)
+    drive_motors(setup_move_forward, speed, speed * STEER_INNER_RATIO)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function drives both motors from a signed speed, where a negative
+#   speed moves backward.
+#
+# INPUT PARAMETERS:
+#   speed - the speed of the motors, from -100 to 100
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def drive_speed(speed):
+    if (speed < 0):
+        move_backward(abs(speed))
+    else:
+        move_forward(speed)
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -400,16 +575,88 @@ def detect_distance():
 
 
 def detect_distance_thread():
-    global global_avoiding_object
-    global global_speed
     while True:
-        dist = detect_distance()
-        if (dist > UV_MINIMUM_DISTANCE and dist < UV_MAXIMUM_DISTANCE):
-            global_avoiding_object = True
-            for i in range(10):
-                move_backward(global_speed)
-        global_avoiding_object = False
-        time.sleep(0.5)
+        avoid_obstacle(detect_distance())
+        time.sleep(ULTRASONIC_PERIOD)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function applies an ultrasonic distance reading. In automatic mode,
+#   while an object is closer than UV_MAXIMUM_DISTANCE the car backs away
+#   from it and the line following is paused, and once it is out of range
+#   the line following takes over again.
+#
+# INPUT PARAMETERS:
+#   dist - the distance to the object in front, 0 if there was no echo
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def avoid_obstacle(dist):
+    global_state.update(distance=dist)
+    global_bus.publish(DistanceReading(dist))
+    state = global_state.current
+    avoiding = (state.mode == "automatic" and
+                dist > UV_MINIMUM_DISTANCE and dist < UV_MAXIMUM_DISTANCE)
+    if (avoiding != state.avoiding_object):
+        global_state.update(avoiding_object=avoiding)
+    if (avoiding):
+        move_backward(abs(state.speed))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function loads the tuned settings from a config file written by
+#   tuner.py. Settings missing from the file keep their defaults. Every
+#   setting is checked against CONFIG_LIMITS before any of them is used, so a
+#   bad file changes nothing.
+#
+# INPUT PARAMETERS:
+#   path - the path of the config file
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the settings that were loaded, raises ValueError for a bad setting
+# -----------------------------------------------------------------------------
+
+
+def load_config(path):
+    global PWM_FREQUENCY
+    global UV_MAXIMUM_DISTANCE
+    global STEER_INNER_RATIO
+    global OBSTACLE_AVOIDANCE
+    with open(path) as file:
+        config = json.load(file)
+    if (not isinstance(config, dict)):
+        raise ValueError("%s does not hold a JSON object" % path)
+    unknown = sorted(set(config) - set(CONFIG_KEYS))
+    if (unknown):
+        raise ValueError("Unknown settings in %s: %s" %
+                         (path, ", ".join(unknown)))
+    for key, value in config.items():
+        kind, lowest, highest = CONFIG_LIMITS[key]
+        # bool is an int in Python, so true would pass as a speed of 1
+        if (not isinstance(value, kind) or
+                (kind is not bool and isinstance(value, bool))):
+            raise ValueError("Bad setting in %s: %s must be %s, not %r" %
+                             (path, key, CONFIG_TYPE_NAMES[kind], value))
+        if (not lowest <= value <= highest):
+            raise ValueError("Bad setting in %s: %s must be from %g to %g, "
+                             "not %r" % (path, key, lowest, highest, value))
+    PWM_FREQUENCY = config.get("pwm_frequency", PWM_FREQUENCY)
+    UV_MAXIMUM_DISTANCE = config.get("uv_maximum_distance",
+                                     UV_MAXIMUM_DISTANCE)
+    STEER_INNER_RATIO = config.get("steer_inner_ratio", STEER_INNER_RATIO)
+    OBSTACLE_AVOIDANCE = config.get("obstacle_avoidance", OBSTACLE_AVOIDANCE)
+    if ("speed" in config):
+        global_state.update(speed=config["speed"])
+    return config
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -452,6 +699,9 @@ def home():
         <h2>Stop</h2>
         <p>You can stop the car completely with this button.</p>
         <button id="immediate-stop">Stop</button>
+        <button id="resume">Resume</button>
+        <h2>Link</h2>
+        <span id="linkValue">Link: waiting</span>
         <script>
             var slider = document.getElementById("speedSlider");
             var output = document.getElementById("speedValue");
@@ -459,7 +709,37 @@ def home():
             var automaticButton = document.getElementById("automatic")
             var manualButton = document.getElementById("manual")
             var stopButton = document.getElementById("immediate-stop")
+            var resumeButton = document.getElementById("resume")
+            var linkOutput = document.getElementById("linkValue")
+            // Each open page is its own client, and the one that last
+            // drove the car is the one the deadman watches
+            var clientId = Math.random().toString(36).slice(2)
+            var heartbeatSeq = 0
+            var heartbeatSent = {}
+            var lastRtt = -1
             output.innerHTML = "Speed: " + slider.value;
+
+            // Heartbeat, the car stops if these stop arriving
+            setInterval(function() {
+                var seq = ++heartbeatSeq;
+                var xhr = new XMLHttpRequest();
+                xhr.open('POST', '/heartbeat', true);
+                xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
+                xhr.onload = function() {
+                    lastRtt = performance.now() - heartbeatSent[seq];
+                    delete heartbeatSent[seq];
+                    var stats = JSON.parse(xhr.responseText);
+                    linkOutput.innerHTML = "Link: " + lastRtt.toFixed(1) +
+                        " ms, jitter " + stats.rtt_jitter_ms.toFixed(1) + " ms";
+                }
+                xhr.onerror = function() {
+                    delete heartbeatSent[seq];
+                    linkOutput.innerHTML = "Link: lost";
+                }
+                heartbeatSent[seq] = performance.now();
+                xhr.send('client=' + clientId + '&seq=' + seq +
+                         '&rtt=' + lastRtt);
+            }, {{heartbeat_period_ms}});
             
             jingleBellsButton.onclick = function() {
                 var xhr = new XMLHttpRequest();
@@ -472,7 +752,7 @@ def home():
                 var xhr = new XMLHttpRequest();
                 xhr.open('POST', '/switch_automatic_thread', true);
                 xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
-                xhr.send()
+                xhr.send('client=' + clientId)
                 output.innerHTML = "Speed: Automatic"
             }
             
@@ -480,14 +760,29 @@ def home():
                 var xhr = new XMLHttpRequest();
                 xhr.open('POST', '/switch_manual', true);
                 xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
-                xhr.send()
+                xhr.send('client=' + clientId)
             }
                     
             stopButton.onclick = function() {
                 var xhr = new XMLHttpRequest();
-                xhr.open('POST', '/cleanup', true);
+                xhr.open('POST', '/estop', true);
                 xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
+                xhr.onload = function() {
+                    if (xhr.status != 200) {
+                        output.innerHTML = "Stop NOT confirmed!"
+                    }
+                }
                 xhr.send()
+                output.innerHTML = "Speed: Stopped"
+            }
+
+            resumeButton.onclick = function() {
+                var xhr = new XMLHttpRequest();
+                xhr.open('POST', '/resume', true);
+                xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
+                xhr.send('client=' + clientId)
+                slider.value = 0
+                output.innerHTML = "Speed: 0"
             }
             
             slider.oninput = function() {
@@ -495,10 +790,105 @@ def home():
                 var xhr = new XMLHttpRequest();
                 xhr.open('POST', '/set_speed', true);
                 xhr.setRequestHeader('Content-type', 'application/x-www-form-urlencoded');
-                xhr.send('speed=' + this.value);
+                xhr.send('client=' + clientId + '&speed=' + this.value);
             }
         </script>
-    ''')
+    ''', heartbeat_period_ms=int(HEARTBEAT_PERIOD * MILLISECONDS))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function carries out a command event from the web page or the
+#   deadman, and then publishes it on the bus for any subscribers.
+#
+# INPUT PARAMETERS:
+#   command - the command event
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   for an emergency stop, whether the motors were confirmed stopped
+# -----------------------------------------------------------------------------
+
+
+def send_command(command):
+    result = None
+    if (isinstance(command, EmergencyStop)):
+        result = emergency_stop()
+    elif (isinstance(command, SetSpeed)):
+        apply_speed(command.speed)
+    elif (isinstance(command, SetMode)):
+        apply_mode(command.mode)
+    elif (isinstance(command, Resume)):
+        resume()
+    elif (isinstance(command, StopMotors)):
+        stop_motors()
+    global_bus.publish(command)
+    return result
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function sets the speed from the slider and drives the motors, or
+#   passes it on to the controller process in isolated controller mode.
+#
+# INPUT PARAMETERS:
+#   speed - the speed of the motors, from -100 to 100
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def apply_speed(speed):
+    global_state.update(speed=speed)
+    if (global_control_block is not None):
+        publish_command()
+    else:
+        drive_speed(speed)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function switches between manual and automatic mode. Automatic mode
+#   runs in its own thread, or in the controller process in isolated
+#   controller mode.
+#
+# INPUT PARAMETERS:
+#   mode - "manual" or "automatic"
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def apply_mode(mode):
+    global global_automatic_thread
+    if (global_control_block is not None):
+        global_state.update(mode=mode)
+        publish_command()
+    elif (mode == "automatic"):
+        with global_automatic_lock:
+            if (global_automatic_thread is not None and
+                    global_automatic_thread.is_alive()):
+                return
+            # Set the mode before the thread starts, so a manual or emergency
+            # stop that comes in right after can't be overwritten by it.
+            global_state.update(mode="automatic")
+            global_automatic_thread = threading.Thread(
+                target=switch_automatic)
+            global_automatic_thread.start()
+    else:
+        # The loop never takes the lock, so it can be joined while holding it
+        with global_automatic_lock:
+            global_state.update(mode="manual")
+            if (global_automatic_thread is not None):
+                global_automatic_thread.join()
+                global_automatic_thread = None
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -517,10 +907,8 @@ def home():
 
 @route("/switch_manual", method="POST")
 def switch_manual():
-    global global_automatic_thread
-    global global_mode
-    global_automatic_thread.stop()
-    global_mode = "manual"
+    driver_from_request()
+    send_command(SetMode("manual"))
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -539,29 +927,78 @@ def switch_manual():
 
 
 def switch_automatic():
-    global global_avoiding_object
-    global global_speed
-    global global_mode
-
-    global_mode = "automatic"
-
-    while (global_mode == "automatic"):
-        if (not global_avoiding_object):
-            if (ir_2_senses() == SENSED_BLACK and ir_1_senses() == SENSED_WHITE):
-                move_right(global_speed)
-            elif (ir_1_senses() == SENSED_BLACK and ir_2_senses() == SENSED_WHITE):
-                move_left(global_speed)
-            else:
-                # The code below was part of the ultrasonic sensor, and is
-                # commented to disable it.
-                """dist = detect_distance()
-                if (dist > 0 and dist < 7):
-                    global_avoiding_object = True
-                    for i in range(10):
-                        move_backward(100)
-                        time.sleep(0.1)
-                global_avoiding_object = False"""
-                move_forward(abs(global_speed))
+    cpu = realtime_cpu_from_env()
+    if (cpu is not None):
+        # Only for this thread. The garbage collector is for the whole
+        # process, and the web server runs in it too, so it is only frozen
+        # in the isolated controller process.
+        enable_realtime(cpu, freeze_gc=False)
+    timer = TickTimer(CONTROL_TICK_PERIOD, global_jitter_recorder)
+    if (global_run_logger is not None):
+        global_run_logger.start_session(time.monotonic())
+
+    while (global_state.current.mode == "automatic"):
+        automatic_step()
+        timer.wait()
+
+    if (global_run_logger is not None):
+        global_run_logger.flush()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is one pass of the automatic mode. It reads the infrared
+#   sensors and steers the car to follow the line.
+#
+# INPUT PARAMETERS:
+#   now - the monotonic time of the pass, None for the current time
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the left and right infrared sensor readings
+# -----------------------------------------------------------------------------
+
+
+def automatic_step(now=None):
+    if (now is None):
+        now = time.monotonic()
+    state = global_state.current
+    snapshot = global_ir_reader.read()
+    ir_1 = snapshot.ir_1
+    ir_2 = snapshot.ir_2
+    speed = state.speed
+    if (global_track_follower is not None):
+        # Backing away from an object doesn't move the car along the track
+        duty = (state.duty1 + state.duty2) / 2
+        if (state.avoiding_object or state.direction == BACKWARD):
+            duty = 0
+        speed = global_track_follower.update(ir_1, ir_2, duty, state.speed,
+                                             now)
+    if (not state.avoiding_object):
+        if (ir_2 == SENSED_BLACK and ir_1 == SENSED_WHITE):
+            move_right(speed)
+        elif (ir_1 == SENSED_BLACK and ir_2 == SENSED_WHITE):
+            move_left(speed)
+        else:
+            # The code below was part of the ultrasonic sensor, and is
+            # commented to disable it.
+            """dist = detect_distance()
+            if (dist > 0 and dist < 7):
+                global_state.update(avoiding_object=True)
+                for i in range(10):
+                    move_backward(100)
+                    time.sleep(0.1)
+            global_state.update(avoiding_object=False)"""
+            move_forward(abs(speed))
+        if (global_run_logger is not None):
+            state = global_state.current
+            global_run_logger.log(now, state.duty1,
+                                  state.duty2, state.direction,
+                                  ir_1, ir_2, state.distance)
+    if (global_bus.wants(SensorReading)):
+        global_bus.publish(SensorReading(ir_1, ir_2, state.distance))
+    return ir_1, ir_2
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -580,9 +1017,8 @@ def switch_automatic():
 
 @route("/switch_automatic_thread", method="POST")
 def switch_automatic_thread():
-    global global_automatic_thread
-    global_automatic_thread = threading.Thread(target=switch_automatic)
-    global_automatic_thread.start()
+    driver_from_request()
+    send_command(SetMode("automatic"))
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
@@ -602,13 +1038,9 @@ def switch_automatic_thread():
 
 @route('/set_speed', method='POST')
 def set_speed():
-    global global_speed
     try:
-        global_speed = int(request.forms.get('speed'))
-        if (global_speed < 0):
-            move_backward(abs(global_speed))
-        else:
-            move_forward(global_speed)
+        driver_from_request()
+        send_command(SetSpeed(int(request.forms.get('speed'))))
     except Exception as e:
         return e
     return ''
@@ -635,7 +1067,43 @@ def do_buzz():
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function routes the webserver to do the cleanup.
+#   This function is the emergency stop fast path. It latches the stop state
+#   first, so that every motor command after it is ignored, and then sets the
+#   motor duty to zero. Unlike cleanup, the GPIO and PWMs stay set up, so the
+#   car can be resumed without restarting the program. In isolated
+#   controller mode the stop is only confirmed once the controller process
+#   reports it latched.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   True if the motors were confirmed stopped, otherwise False
+# -----------------------------------------------------------------------------
+
+
+def emergency_stop():
+    state = global_state.update(estop_latched=True, mode="manual")
+    if (global_control_block is not None):
+        publish_command()
+        return wait_for_controller(True)
+    # Cut the motors straight away, then again under the lock in case a
+    # command was already past the latch check when we latched.
+    set_motor_speed(state.motor_pwm1, 0)
+    set_motor_speed(state.motor_pwm2, 0)
+    with global_motor_lock:
+        set_motor_speed(state.motor_pwm1, 0)
+        set_motor_speed(state.motor_pwm2, 0)
+        global_state.update(duty1=0, duty2=0)
+    return True
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function releases the emergency stop. The motors stay at zero until
+#   the next command, and setup_gpio is not run again.
 #
 # INPUT PARAMETERS:
 #   none
@@ -648,13 +1116,19 @@ def do_buzz():
 # -----------------------------------------------------------------------------
 
 
-@route("/cleanup", method='POST')
-def do_cleanup():
-    cleanup()
+def resume():
+    with global_motor_lock:
+        global_state.update(speed=0, estop_latched=False)
+    if (global_control_block is not None):
+        publish_command()
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This function cleans up the GPIO.
+#   This function returns the emergency stop state and the measured latency
+#   from the request arriving to the motors being off. In isolated controller
+#   mode "latched" is what the controller process reports, and "requested" is
+#   what the web server asked for. Stops the controller never confirmed are
+#   counted in "unconfirmed" and left out of the latencies.
 #
 # INPUT PARAMETERS:
 #   none
@@ -663,20 +1137,63 @@ def do_cleanup():
 #   none
 #
 # RETURN:
+#   a dictionary with the emergency stop state and latencies in milliseconds
+# -----------------------------------------------------------------------------
+
+
+def estop_status():
+    requested = global_state.current.estop_latched
+    latched = requested
+    if (global_control_block is not None):
+        try:
+            latched = bool(global_control_block.read_status().latched)
+        except TimeoutError:
+            latched = None
+    with global_estop_lock:
+        return {
+            "latched": latched,
+            "requested": requested,
+            "count": global_estop_count,
+            "unconfirmed": global_estop_unconfirmed,
+            "last_latency_ms": global_estop_last_latency * MILLISECONDS,
+            "max_latency_ms": global_estop_max_latency * MILLISECONDS,
+        }
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function counts an emergency stop. Confirmed stops are latency
+#   samples, the others are only counted as unconfirmed.
+#
+# INPUT PARAMETERS:
+#   confirmed - whether the stop was confirmed
+#   latency - seconds from the request arriving to the motors being off
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
 #   none
 # -----------------------------------------------------------------------------
 
 
-def cleanup():
-    global global_motor_pwm1
-    global global_motor_pwm2
-    global_motor_pwm1.stop()
-    global_motor_pwm2.stop()
-    GPIO.cleanup()
+def record_estop(confirmed, latency):
+    global global_estop_count
+    global global_estop_unconfirmed
+    global global_estop_last_latency
+    global global_estop_max_latency
+    with global_estop_lock:
+        if (confirmed):
+            global_estop_count += 1
+            global_estop_last_latency = latency
+            global_estop_max_latency = max(global_estop_max_latency, latency)
+        else:
+            global_estop_unconfirmed += 1
 
 # -----------------------------------------------------------------------------
 # DESCRIPTION
-#   This is the main function that sets the GPIO up and runs the server.
+#   This function routes the webserver to the emergency stop, and measures
+#   the latency from the request arriving to the motors being off. If the
+#   controller process did not confirm the stop, the response is an error.
 #
 # INPUT PARAMETERS:
 #   none
@@ -685,17 +1202,780 @@ def cleanup():
 #   none
 #
 # RETURN:
+#   the emergency stop status, with whether the stop was confirmed
+# -----------------------------------------------------------------------------
+
+
+@route("/estop", method='POST')
+def do_estop():
+    arrival = request.environ.get("picar.arrival_time", time.perf_counter())
+    confirmed = send_command(EmergencyStop())
+    record_estop(confirmed, time.perf_counter() - arrival)
+    if (not confirmed):
+        response.status = 503
+    status = estop_status()
+    status["confirmed"] = confirmed
+    return status
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function routes the webserver to resume after an emergency stop.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
 #   none
+#
+# RETURN:
+#   the emergency stop status
 # -----------------------------------------------------------------------------
 
 
-def main():
-    try:
-        setup_gpio()
-        run(host="0.0.0.0", port=80)
+@route("/resume", method='POST')
+def do_resume():
+    driver_from_request()
+    send_command(Resume())
+    return estop_status()
 
-    except KeyboardInterrupt:
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function routes the webserver to the emergency stop status.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the emergency stop status
+# -----------------------------------------------------------------------------
+
+
+@route("/estop_status")
+def do_estop_status():
+    return estop_status()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function brings the motors to a stop and goes back to manual mode,
+#   without latching the emergency stop.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def stop_motors():
+    if (global_control_block is not None):
+        global_state.update(mode="manual", speed=0)
+        publish_command()
+        return
+    with global_motor_lock:
+        state = global_state.update(mode="manual", speed=0, duty1=0, duty2=0)
+        set_motor_speed(state.motor_pwm1, 0)
+        set_motor_speed(state.motor_pwm2, 0)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the link to one control page: its last heartbeat and its
+#   round trip time statistics. It is only used under global_link_lock.
+# -----------------------------------------------------------------------------
+
+
+class ClientLink:
+    def __init__(self):
+        self.last_heartbeat = None
+        self.last_seen = None
+        self.heartbeats = 0
+        self.rtt_last = 0.0
+        self.rtt_mean = 0.0
+        self.rtt_jitter = 0.0
+
+    def heartbeat(self, rtt, now):
+        self.last_heartbeat = now
+        self.last_seen = now
+        self.heartbeats += 1
+        if (rtt < 0):
+            return
+        if (self.rtt_mean == 0):
+            self.rtt_mean = rtt
+        else:
+            # Smoothed round trip time and jitter, as in TCP and RFC 3550
+            self.rtt_mean += (rtt - self.rtt_mean) * RTT_MEAN_GAIN
+            self.rtt_jitter += (abs(rtt - self.rtt_last) -
+                                self.rtt_jitter) * RTT_JITTER_GAIN
+        self.rtt_last = rtt
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function records a heartbeat from a control page, and updates the
+#   round trip time statistics of its link with the round trip time the page
+#   measured for its previous heartbeat.
+#
+# INPUT PARAMETERS:
+#   rtt - the round trip time in seconds, or a negative number if unknown
+#   now - the monotonic time the heartbeat arrived
+#   client - the client id of the page
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def record_heartbeat(rtt, now, client=DEFAULT_CLIENT):
+    with global_link_lock:
+        link = global_links.get(client)
+        if (link is None):
+            link = global_links[client] = ClientLink()
+        link.heartbeat(rtt, now)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes a client the driver, the one whose heartbeats the
+#   deadman watches. It is called for every drive command.
+#
+# INPUT PARAMETERS:
+#   client - the client id of the page that sent the command
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def set_driver(client):
+    global global_driver
+    with global_link_lock:
+        global_driver = client
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes the client that sent the current request the driver.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def driver_from_request():
+    set_driver(request.forms.get('client', DEFAULT_CLIENT))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the deadman check. If the deadman is armed and no
+#   heartbeat arrived from the driver within the timeout, it stops the motors
+#   and disarms until the driver's next heartbeat. The time from the last
+#   heartbeat to the stop is at most HEARTBEAT_TIMEOUT +
+#   HEARTBEAT_CHECK_PERIOD + DEADMAN_STOP_TIME. Links of other clients that
+#   have been silent for LINK_FORGET_TIME are forgotten.
+#
+# INPUT PARAMETERS:
+#   now - the monotonic time of the check
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   True if the motors were stopped, otherwise False
+# -----------------------------------------------------------------------------
+
+
+def check_heartbeat(now):
+    global global_deadman_trips
+    global global_deadman_last_detection
+    with global_link_lock:
+        for client in [client for client, link in global_links.items()
+                       if (client != global_driver and
+                           now - link.last_seen > LINK_FORGET_TIME)]:
+            del global_links[client]
+        link = global_links.get(global_driver)
+        if (link is None or link.last_heartbeat is None or
+                now - link.last_heartbeat <= HEARTBEAT_TIMEOUT):
+            return False
+        last = link.last_heartbeat
+        link.last_heartbeat = None
+    # The detection time is from the last heartbeat to the motors being off,
+    # counted from the check time so it can be tested with a made up clock.
+    started = time.monotonic()
+    send_command(StopMotors("deadman"))
+    with global_link_lock:
+        global_deadman_trips += 1
+        global_deadman_last_detection = (now - last +
+                                         time.monotonic() - started)
+    return True
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the thread that runs the deadman check.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def heartbeat_watchdog_thread():
+    while True:
+        check_heartbeat(time.monotonic())
+        time.sleep(HEARTBEAT_CHECK_PERIOD)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the statistics of a client's control link, and of
+#   the deadman.
+#
+# INPUT PARAMETERS:
+#   client - the client id, None for the driver
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the link statistics, times in milliseconds
+# -----------------------------------------------------------------------------
+
+
+def link_stats(client=None):
+    with global_link_lock:
+        if (client is None):
+            client = global_driver
+        link = global_links.get(client, ClientLink())
+        driver = global_links.get(global_driver)
+        return {
+            "client": client,
+            "driving": client == global_driver,
+            "clients": len(global_links),
+            "armed": (driver is not None and
+                      driver.last_heartbeat is not None),
+            "heartbeats": link.heartbeats,
+            "rtt_last_ms": link.rtt_last * MILLISECONDS,
+            "rtt_mean_ms": link.rtt_mean * MILLISECONDS,
+            "rtt_jitter_ms": link.rtt_jitter * MILLISECONDS,
+            "timeout_ms": HEARTBEAT_TIMEOUT * MILLISECONDS,
+            "detection_bound_ms": (HEARTBEAT_TIMEOUT +
+                                   HEARTBEAT_CHECK_PERIOD +
+                                   DEADMAN_STOP_TIME) * MILLISECONDS,
+            "deadman_trips": global_deadman_trips,
+            "deadman_last_detection_ms":
+                global_deadman_last_detection * MILLISECONDS,
+        }
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the handler for the heartbeat from the control page. The
+#   page sends its client id, a sequence number and the round trip time in
+#   milliseconds it measured for its previous heartbeat.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the sequence number and the statistics of the page's link
+# -----------------------------------------------------------------------------
+
+
+@route("/heartbeat", method='POST')
+def do_heartbeat():
+    try:
+        seq = int(request.forms.get('seq', 0))
+        rtt = float(request.forms.get('rtt', -1))
+    except ValueError as e:
+        return e
+    if (rtt >= 0):
+        rtt = rtt / MILLISECONDS
+    client = request.forms.get('client', DEFAULT_CLIENT)
+    record_heartbeat(rtt, time.monotonic(), client)
+    stats = link_stats(client)
+    stats["seq"] = seq
+    return stats
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function routes the webserver to the link statistics, of the
+#   client given in the query string or else of the driver.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the link statistics
+# -----------------------------------------------------------------------------
+
+
+@route("/link_stats")
+def do_link_stats():
+    return link_stats(request.query.get('client'))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function routes the webserver to do the cleanup.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+@route("/cleanup", method='POST')
+def do_cleanup():
+    cleanup()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function cleans up the GPIO.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def cleanup():
+    state = global_state.current
+    if (state.motor_pwm1 is not None):
+        state.motor_pwm1.stop()
+        state.motor_pwm2.stop()
+    GPIO.cleanup()
+    if (global_run_logger is not None):
+        global_run_logger.close()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function writes the current speed, mode and emergency stop to the
+#   controller process.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def publish_command():
+    # The seqlock allows one writer, and handlers run in many threads
+    with global_command_lock:
+        state = global_state.current
+        global_control_block.write_command(state.speed,
+                                           state.mode == "automatic",
+                                           state.estop_latched)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function waits for the controller process to report the emergency
+#   stop state, so the caller knows the motors were actually stopped.
+#
+# INPUT PARAMETERS:
+#   latched - the emergency stop state to wait for
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   True if the controller reported the state in time, otherwise False
+# -----------------------------------------------------------------------------
+
+
+def wait_for_controller(latched):
+    deadline = time.perf_counter() + CONTROLLER_ACK_TIMEOUT
+    while True:
+        remaining = deadline - time.perf_counter()
+        if (remaining <= 0):
+            return False
+        try:
+            status = global_control_block.read_status(remaining)
+        except TimeoutError:
+            return False
+        if (status.latched == latched):
+            return True
+        time.sleep(0)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the SIGTERM handler. It raises KeyboardInterrupt, so a
+#   kill shuts down the same way as Ctrl-C and the motors are stopped.
+#
+# INPUT PARAMETERS:
+#   signum - the signal number
+#   frame - the stack frame the signal interrupted
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the controller process for isolated controller mode. It
+#   owns the GPIO and runs the control loop at a fixed tick, reading the
+#   command from shared memory and writing back the sensor snapshot, so the
+#   control timing does not depend on the web server load.
+#
+#   The deadman runs in the web server. If the web server dies without
+#   stopping the controller (killed, crashed or out of memory), the
+#   controller is handed to another parent, so it stops the car and exits
+#   when its parent is no longer the web server.
+#
+# INPUT PARAMETERS:
+#   name - the name of the shared memory block
+#   server_pid - the process id of the web server
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def controller_process(name, server_pid):
+    global global_control_block
+    # The block is only for the web server side, in here the moves have to
+    # drive the motors directly.
+    global_control_block = None
+    signal.signal(signal.SIGTERM, interrupt)
+    block = ControlBlock(name)
+    setup_gpio()
+    if (OBSTACLE_AVOIDANCE):
+        threading.Thread(target=detect_distance_thread, daemon=True).start()
+    cpu = realtime_cpu_from_env()
+    if (cpu is not None):
+        print("Real-time settings: %s" % enable_realtime(cpu))
+    timer = TickTimer(CONTROL_TICK_PERIOD, global_jitter_recorder)
+    applied = None
+    ticks = 0
+    parent_check_ticks = max(1, round(PARENT_CHECK_PERIOD /
+                                      CONTROL_TICK_PERIOD))
+    orphaned = False
+    command = Command(0, False, False)
+    try:
+        while (not orphaned):
+            if (ticks % parent_check_ticks == 0 and
+                    os.getppid() != server_pid):
+                # Stop the car on this last tick
+                print("The web server is gone, stopping the car")
+                orphaned = True
+                command = command._replace(speed=0, automatic=False)
+            else:
+                try:
+                    command = block.read_command(CONTROL_TICK_PERIOD)
+                except TimeoutError:
+                    # The web server stopped in the middle of writing a
+                    # command. Stop the car, keeping the emergency stop as it
+                    # was, until a whole command is written.
+                    command = command._replace(speed=0, automatic=False)
+            state = global_state.current
+            if (command.estop and not state.estop_latched):
+                emergency_stop()
+            elif (not command.estop and state.estop_latched):
+                resume()
+            mode = "automatic" if command.automatic else "manual"
+            state = global_state.current
+            if (state.speed != command.speed or state.mode != mode):
+                if (mode == "automatic" and state.mode != mode and
+                        global_run_logger is not None):
+                    global_run_logger.start_session(time.monotonic())
+                global_state.update(speed=command.speed, mode=mode)
+            if (command.automatic):
+                ir_1, ir_2 = automatic_step()
+                applied = None
+            else:
+                if (command != applied):
+                    drive_speed(command.speed)
+                    applied = command
+                snapshot = global_ir_reader.read()
+                ir_1 = snapshot.ir_1
+                ir_2 = snapshot.ir_2
+            ticks += 1
+            state = global_state.current
+            block.write_status(ticks, time.monotonic(), ir_1, ir_2,
+                               state.estop_latched, state.direction,
+                               state.duty1, state.duty2, state.distance,
+                               timer.overruns)
+            timer.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cleanup()
+        block.close()
+        print(global_jitter_recorder.report())
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the infrared sensor reader statistics: whether the
+#   sensors are read in one batched read, the filter, the snapshots taken,
+#   the GPIO reads made for them and the reads saved compared to reading
+#   each sensor with GPIO.input. In isolated controller mode the sensors are
+#   read in the controller process, so there is nothing to show here.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the sensor reader statistics
+# -----------------------------------------------------------------------------
+
+
+@route("/sensors")
+def do_sensors():
+    if (global_ir_reader is None):
+        return {"isolated": global_control_block is not None}
+    return global_ir_reader.stats()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the current car state snapshot.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the car state
+# -----------------------------------------------------------------------------
+
+
+@route("/state")
+def do_state():
+    return global_state.current.as_dict()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the wake-up error statistics and histogram of the
+#   automatic mode control ticks. In isolated controller mode the controller
+#   process prints them when it exits instead.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the jitter statistics
+# -----------------------------------------------------------------------------
+
+
+@route("/jitter")
+def do_jitter():
+    stats = global_jitter_recorder.stats()
+    stats["histogram_us"] = [row for row in global_jitter_recorder.histogram()
+                             if row[2] > 0]
+    return stats
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the state of the learned track map. In isolated
+#   controller mode the map is learned in the controller process, so this
+#   only shows the map that was loaded when the car started.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the track follower state and the map
+# -----------------------------------------------------------------------------
+
+
+@route("/track_map")
+def do_track_map():
+    follower = global_track_follower
+    if (follower is None):
+        return {"enabled": False}
+    segments = None
+    if (follower.track_map is not None):
+        segments = follower.track_map.segments
+    return {"enabled": True, "state": follower.state, "laps": follower.laps,
+            "segments": segments}
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the latest status from the controller process.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary with the controller status
+# -----------------------------------------------------------------------------
+
+
+@route("/controller_status")
+def do_controller_status():
+    if (global_control_block is None):
+        return {"isolated": False}
+    try:
+        status = global_control_block.read_status()._asdict()
+    except TimeoutError as e:
+        response.status = 503
+        return {"isolated": True, "error": str(e)}
+    status["isolated"] = True
+    return status
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the request handler for the web server. It stamps the time the
+#   request arrived, so the emergency stop latency can be measured.
+# -----------------------------------------------------------------------------
+
+
+class TimedRequestHandler(WSGIRequestHandler):
+    def parse_request(self):
+        self.arrival_time = time.perf_counter()
+        return WSGIRequestHandler.parse_request(self)
+
+    def get_environ(self):
+        env = WSGIRequestHandler.get_environ(self)
+        env["picar.arrival_time"] = self.arrival_time
+        return env
+
+    def log_request(self, *args, **kw):
+        if (not self.server.quiet):
+            return WSGIRequestHandler.log_request(self, *args, **kw)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the web server that handles every request in its own thread, so
+#   an emergency stop never has to wait behind a request that is in flight.
+# -----------------------------------------------------------------------------
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    quiet = False
+    # Every open control page sends a burst of requests while the slider is
+    # dragged, the default backlog of 5 drops connections under load.
+    request_queue_size = 128
+
+
+class ThreadingWSGIRefServer(ServerAdapter):
+    def run(self, app):
+        server = make_server(self.host, self.port, app,
+                             ThreadingWSGIServer, TimedRequestHandler)
+        server.quiet = self.quiet
+        server.serve_forever()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that sets the GPIO up and runs the server.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    global global_run_logger
+    global global_control_block
+    global global_track_follower
+    controller = None
+    signal.signal(signal.SIGTERM, interrupt)
+    try:
+        if ("PICAR_CONFIG" in os.environ or os.path.exists(CONFIG_PATH)):
+            print("Loaded %s: %s" % (CONFIG_PATH, load_config(CONFIG_PATH)))
+        if (os.environ.get("PICAR_RUN_LOG")):
+            global_run_logger = RunLogger(os.environ["PICAR_RUN_LOG"])
+        if (os.environ.get("PICAR_TRACK_MAP")):
+            global_track_follower = TrackFollower(
+                os.environ["PICAR_TRACK_MAP"], CONTROL_TICK_PERIOD)
+        if (os.environ.get("PICAR_ISOLATED_CONTROLLER")):
+            # The controller process owns the motors, this process only
+            # needs the GPIO for the buzzer.
+            GPIO.setmode(GPIO.BCM)
+            global_control_block = ControlBlock()
+            controller = multiprocessing.Process(
+                target=controller_process,
+                args=(global_control_block.name, os.getpid()), daemon=True)
+            controller.start()
+        else:
+            setup_gpio()
+            if (OBSTACLE_AVOIDANCE):
+                threading.Thread(target=detect_distance_thread,
+                                 daemon=True).start()
+        threading.Thread(target=heartbeat_watchdog_thread, daemon=True).start()
+        run(server=ThreadingWSGIRefServer, host="0.0.0.0", port=80)
+
+    except KeyboardInterrupt:
+        pass
+
+    # bottle's run returns on KeyboardInterrupt, so this runs after Ctrl-C or
+    # a SIGTERM either way
+    send_command(StopMotors("shutdown"))
+    if (controller is None):
         cleanup()
+    else:
+        controller.terminate()
+        controller.join(CONTROLLER_EXIT_TIMEOUT)
+        if (controller.is_alive()):
+            controller.kill()
+        global_control_block.close()
+        global_control_block.unlink()
 
 
 # if file execute standalone then call the main function.
@@ -0,0 +1,339 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  realtime.py
+#
+# DESCRIPTION
+#    This code has the real-time settings for the control loop, and a jitter
+#    recorder that measures how late each control tick wakes up.
+#
+#    The real-time settings are pinning the control thread to one CPU,
+#    running it with SCHED_FIFO priority when the user is allowed to, and
+#    freezing and disabling the garbage collector so it can't pause a tick.
+#
+#    Running this file runs a jitter loop with each setting in turn and prints
+#    the wake-up error histograms, so they can be compared on any Linux
+#    computer:
+#
+#        python realtime.py --compare --seconds 5
+#
+# NOTES
+#    SCHED_FIFO needs root or the CAP_SYS_NICE capability. Without it the
+#    other settings are still applied.
+#
+#    The CPU pinning and SCHED_FIFO only apply to the calling thread, but the
+#    garbage collector settings apply to the whole process. Only freeze the
+#    garbage collector in a process that runs nothing but the control loop,
+#    like the isolated controller process. Anything else in the process
+#    would keep piling up reference cycles that are never collected.
+#
+# *****************************************************************************
+
+import argparse
+import gc
+import multiprocessing
+import os
+import time
+from array import array
+
+RT_PRIORITY = 50
+TICK_PERIOD = 0.002
+JITTER_CAPACITY = 1 << 16
+HISTOGRAM_BUCKETS = 20  # powers of two of microseconds, up to about a second
+MICROSECONDS = 1000000
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function applies the real-time settings to the calling thread.
+#
+# INPUT PARAMETERS:
+#   cpu - the CPU to pin the thread to, or None to leave it
+#   priority - the SCHED_FIFO priority, or None to leave the scheduler
+#   freeze_gc - True to freeze and disable the garbage collector
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a dictionary saying which settings were applied
+# -----------------------------------------------------------------------------
+
+
+def enable_realtime(cpu=None, priority=RT_PRIORITY, freeze_gc=True):
+    applied = {"affinity": False, "fifo": False, "gc_frozen": False}
+    if (cpu is not None and hasattr(os, "sched_setaffinity")):
+        try:
+            os.sched_setaffinity(0, {cpu})
+            applied["affinity"] = True
+        except OSError:
+            pass
+    if (priority is not None and hasattr(os, "SCHED_FIFO")):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO,
+                                  os.sched_param(priority))
+            applied["fifo"] = True
+        except OSError:
+            pass
+    if (freeze_gc):
+        # Move everything that exists now out of the collector's way, so the
+        # loop only owns what it allocates itself.
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+        applied["gc_frozen"] = True
+    return applied
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function turns the garbage collector back on after enable_realtime.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def restore_gc():
+    gc.unfreeze()
+    gc.enable()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class records the wake-up error of each tick, which is how late the
+#   tick started compared to when it should have. The samples are kept in a
+#   preallocated ring buffer, and a histogram with power of two microsecond
+#   buckets is kept as they come in.
+# -----------------------------------------------------------------------------
+
+
+class JitterRecorder:
+    def __init__(self, capacity=JITTER_CAPACITY):
+        self.samples = array("d", bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def record(self, error):
+        self.samples[self.count % self.capacity] = error
+        self.count += 1
+        if (error > self.max):
+            self.max = error
+        bucket = int(error * MICROSECONDS).bit_length()
+        if (bucket >= HISTOGRAM_BUCKETS):
+            bucket = HISTOGRAM_BUCKETS - 1
+        self.buckets[bucket] += 1
+
+    def reset(self):
+        self.count = 0
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def stats(self):
+        kept = sorted(self.samples[:min(self.count, self.capacity)])
+        if (len(kept) == 0):
+            return {"count": 0, "p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+        return {
+            "count": self.count,
+            "p50_us": kept[len(kept) // 2] * MICROSECONDS,
+            "p99_us": kept[min(len(kept) - 1,
+                               len(kept) * 99 // 100)] * MICROSECONDS,
+            "max_us": self.max * MICROSECONDS,
+        }
+
+    def histogram(self):
+        rows = []
+        for bucket in range(HISTOGRAM_BUCKETS):
+            low = 0 if bucket == 0 else 1 << (bucket - 1)
+            rows.append((low, 1 << bucket, self.buckets[bucket]))
+        return rows
+
+    def report(self):
+        stats = self.stats()
+        lines = ["wake-up error: p50 %.1f us, p99 %.1f us, max %.1f us "
+                 "over %d ticks" % (stats["p50_us"], stats["p99_us"],
+                                    stats["max_us"], stats["count"])]
+        for low, high, count in self.histogram():
+            if (count > 0):
+                lines.append("  %7d - %7d us  %d" % (low, high, count))
+        return "\n".join(lines)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class keeps a loop on a fixed tick. Each call to wait sleeps until
+#   the next tick and records how late it woke up. If the loop falls behind
+#   it counts an overrun and starts again from now, instead of running a
+#   burst of late ticks to catch up.
+# -----------------------------------------------------------------------------
+
+
+class TickTimer:
+    def __init__(self, period=TICK_PERIOD, recorder=None):
+        self.period = period
+        self.recorder = recorder
+        self.overruns = 0
+        self.next_tick = time.perf_counter() + period
+
+    def wait(self):
+        delay = self.next_tick - time.perf_counter()
+        if (delay > 0):
+            time.sleep(delay)
+        else:
+            self.overruns += 1
+        now = time.perf_counter()
+        if (self.recorder is not None):
+            self.recorder.record(max(0.0, now - self.next_tick))
+        if (delay > 0):
+            self.next_tick += self.period
+        else:
+            self.next_tick = now + self.period
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function reads the real-time settings for the car from the
+#   environment. PICAR_REALTIME turns them on, and PICAR_REALTIME_CPU picks
+#   the CPU, which defaults to the last one.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the CPU to use, or None if real-time mode is off
+# -----------------------------------------------------------------------------
+
+
+def realtime_cpu_from_env():
+    if (not os.environ.get("PICAR_REALTIME")):
+        return None
+    return int(os.environ.get("PICAR_REALTIME_CPU", os.cpu_count() - 1))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is a stand-in control loop that measures the jitter. Each
+#   tick does a little work that allocates objects, like the real loop does,
+#   so the garbage collector has something to do.
+#
+# INPUT PARAMETERS:
+#   seconds - how long to run
+#   period - the tick period in seconds
+#   cpu - the CPU to pin to, or None
+#   priority - the SCHED_FIFO priority, or None
+#   freeze_gc - True to freeze and disable the garbage collector
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the applied settings and the jitter report
+# -----------------------------------------------------------------------------
+
+
+def jitter_loop(seconds, period, cpu, priority, freeze_gc):
+    applied = enable_realtime(cpu, priority, freeze_gc)
+    recorder = JitterRecorder()
+    timer = TickTimer(period, recorder)
+    garbage = []
+    end = time.perf_counter() + seconds
+    while (time.perf_counter() < end):
+        timer.wait()
+        node = {"tick": recorder.count, "readings": [0, 1]}
+        node["self"] = node
+        garbage.append(node)
+        if (len(garbage) > 1000):
+            garbage = []
+    if (freeze_gc):
+        restore_gc()
+    return applied, recorder.report()
+
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function runs the jitter loop in a child process and sends back
+#   the results.
+#
+# INPUT PARAMETERS:
+#   settings - the cpu, priority and freeze_gc settings
+#   seconds - how long to run
+#   period - the tick period in seconds
+#   results - the queue to put the results on
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def run_jitter_loop(settings, seconds, period, results):
+    results.put(jitter_loop(seconds, period, *settings))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that runs the jitter loop with the settings
+#   given on the command line, or every setting in turn with --compare.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure control tick wake-up jitter.")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--period", type=float, default=TICK_PERIOD)
+    parser.add_argument("--cpu", type=int, default=None)
+    parser.add_argument("--priority", type=int, default=None,
+                        help="SCHED_FIFO priority")
+    parser.add_argument("--freeze-gc", action="store_true")
+    parser.add_argument("--compare", action="store_true",
+                        help="run every setting in turn")
+    args = parser.parse_args()
+
+    cpu = args.cpu
+    if (args.compare and cpu is None):
+        cpu = os.cpu_count() - 1
+    if (args.compare):
+        runs = [
+            ("baseline", (None, None, False)),
+            ("affinity", (cpu, None, False)),
+            ("affinity + gc freeze", (cpu, None, True)),
+            ("affinity + gc freeze + fifo", (cpu, RT_PRIORITY, True)),
+        ]
+    else:
+        runs = [("settings", (cpu, args.priority, args.freeze_gc))]
+
+    for name, settings in runs:
+        # Each run is its own process, since the settings can't be undone
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=run_jitter_loop,
+            args=(settings, args.seconds, args.period, results))
+        process.start()
+        applied, report = results.get()
+        process.join()
+        print("== %s %s" % (name, applied))
+        print(report)
+
+
+# if file execute standalone then call the main function.
+if __name__ == '__main__':
+    main()
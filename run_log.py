@@ -0,0 +1,72 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  run_log.py
+#
+# DESCRIPTION
+#    This code records the sensor readings and motor commands of a run to a
+#    binary log file, one fixed size record per control tick. The log can be
+#    analyzed afterwards with analytics.py.
+#
+# NOTES
+#    Each record is packed little-endian with no padding:
+#
+#        t          float64  monotonic time in seconds
+#        duty1      float32  duty cycle of motor 1 (left)
+#        duty2      float32  duty cycle of motor 2 (right)
+#        direction  int8     1 for forward, -1 for backward
+#        ir1        uint8    left infrared sensor, 1 is black
+#        ir2        uint8    right infrared sensor, 1 is black
+#        distance   float32  ultrasonic distance in cm, negative if unknown
+#
+#    analytics.py has the matching NumPy dtype, so both have to be changed
+#    together.
+#
+#    A log file is appended to, so it can hold many automatic mode sessions,
+#    even from before a reboot when the monotonic time started over. Each
+#    session starts with a marker record, which has direction SESSION_MARKER
+#    and everything else zero.
+#
+# *****************************************************************************
+
+import struct
+
+RECORD_FORMAT = struct.Struct("<dffbBBf")
+RECORD_SIZE = RECORD_FORMAT.size
+BUFFER_SIZE = 1 << 16
+
+FORWARD = 1
+BACKWARD = -1
+SESSION_MARKER = 0
+DISTANCE_UNKNOWN = -1.0
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class writes run records to a log file. Records are buffered, so
+#   logging does not slow down the control loop.
+# -----------------------------------------------------------------------------
+
+
+class RunLogger:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab", buffering=BUFFER_SIZE)
+        self.pack = RECORD_FORMAT.pack
+        self.count = 0
+
+    def log(self, t, duty1, duty2, direction, ir1, ir2, distance):
+        self.file.write(self.pack(t, duty1, duty2, direction,
+                                  ir1, ir2, distance))
+        self.count += 1
+
+    def start_session(self, t):
+        self.log(t, 0.0, 0.0, SESSION_MARKER, 0, 0, 0.0)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
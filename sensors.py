@@ -0,0 +1,173 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  sensors.py
+#
+# DESCRIPTION
+#    This code reads the two infrared sensors once per control tick into a
+#    snapshot, so every decision in the tick sees the same readings. On the
+#    Raspberry Pi both sensors are read with one read of the GPIO level
+#    register through /dev/gpiomem. Anywhere else, or if /dev/gpiomem can't
+#    be opened, each sensor is read with GPIO.input.
+#
+#    The readings can be filtered over the last few samples, either by
+#    majority vote or by debouncing (a change only counts once it has been
+#    seen for that many samples in a row).
+#
+# NOTES
+#    The reader counts the snapshots it took and the GPIO reads it made for
+#    them, one per snapshot with the batched read and two without. The reads
+#    saved are counted against reading each sensor with GPIO.input, two
+#    reads per snapshot.
+#
+# *****************************************************************************
+
+import mmap
+import os
+
+GPIO_MEMORY = "/dev/gpiomem"
+GPIO_MEMORY_SIZE = 4096
+GPLEV0_OFFSET = 0x34  # pin level register for GPIO 0 to 31
+
+NO_FILTER = None
+MAJORITY = "majority"
+DEBOUNCE = "debounce"
+DEFAULT_FILTER_SAMPLES = 3
+# GPIO.input calls per snapshot without the batched read
+UNBATCHED_READS = 2
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is a snapshot of the two infrared sensors. There are only four
+#   possible snapshots, so they are made once and shared, and taking a
+#   snapshot never allocates anything.
+# -----------------------------------------------------------------------------
+
+
+class IrSnapshot:
+    __slots__ = ("ir_1", "ir_2", "bits")
+
+    def __init__(self, ir_1, ir_2):
+        self.ir_1 = ir_1
+        self.ir_2 = ir_2
+        self.bits = ir_1 | (ir_2 << 1)
+
+    def __repr__(self):
+        return "IrSnapshot(ir_1=%d, ir_2=%d)" % (self.ir_1, self.ir_2)
+
+
+SNAPSHOTS = tuple(IrSnapshot(bits & 1, bits >> 1) for bits in range(4))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function opens the GPIO level register for reading.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a memoryview of the GPIO registers as 32 bit words, or None if
+#   /dev/gpiomem can't be opened
+# -----------------------------------------------------------------------------
+
+
+def open_gpio_registers():
+    try:
+        fd = os.open(GPIO_MEMORY, os.O_RDONLY | os.O_SYNC)
+    except OSError:
+        return None
+    try:
+        memory = mmap.mmap(fd, GPIO_MEMORY_SIZE, mmap.MAP_SHARED,
+                           mmap.PROT_READ)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    # Indexing a word view does one aligned 32 bit load, which is what the
+    # registers need.
+    return memoryview(memory).cast("I")
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class reads the infrared sensors into snapshots, with optional
+#   filtering.
+# -----------------------------------------------------------------------------
+
+
+class IrSensorReader:
+    def __init__(self, gpio, pin_1, pin_2, use_registers=True,
+                 filter_type=NO_FILTER, samples=DEFAULT_FILTER_SAMPLES):
+        if (samples < 1):
+            raise ValueError("samples must be at least 1")
+        self.gpio = gpio
+        self.pin_1 = pin_1
+        self.pin_2 = pin_2
+        self.registers = open_gpio_registers() if use_registers else None
+        self.filter_type = filter_type
+        self.samples = samples
+        self.history = [0] * samples
+        self.history_index = 0
+        self.counts = [0, 0]
+        self.candidate = 0
+        self.candidate_count = 0
+        self.current = SNAPSHOTS[0]
+        self.snapshots = 0
+        self.reads = 0
+
+    def read_raw(self):
+        if (self.registers is not None):
+            levels = self.registers[GPLEV0_OFFSET // 4]
+            self.reads += 1
+            return (((levels >> self.pin_1) & 1) |
+                    (((levels >> self.pin_2) & 1) << 1))
+        self.reads += UNBATCHED_READS
+        return self.gpio.input(self.pin_1) | (self.gpio.input(self.pin_2) << 1)
+
+    def majority(self, bits):
+        # Keep a running count of ones for each sensor over the window
+        old = self.history[self.history_index]
+        self.history[self.history_index] = bits
+        self.history_index = (self.history_index + 1) % self.samples
+        self.counts[0] += (bits & 1) - (old & 1)
+        self.counts[1] += (bits >> 1) - (old >> 1)
+        half = self.samples // 2
+        return int(self.counts[0] > half) | (int(self.counts[1] > half) << 1)
+
+    def debounce(self, bits):
+        if (bits == self.current.bits):
+            self.candidate_count = 0
+            return bits
+        if (bits != self.candidate):
+            self.candidate = bits
+            self.candidate_count = 0
+        self.candidate_count += 1
+        if (self.candidate_count >= self.samples):
+            self.candidate_count = 0
+            return bits
+        return self.current.bits
+
+    def read(self):
+        bits = self.read_raw()
+        self.snapshots += 1
+        if (self.filter_type == MAJORITY):
+            bits = self.majority(bits)
+        elif (self.filter_type == DEBOUNCE):
+            bits = self.debounce(bits)
+        self.current = SNAPSHOTS[bits]
+        return self.current
+
+    def stats(self):
+        return {
+            "batched": self.registers is not None,
+            "filter": self.filter_type,
+            "samples": self.samples,
+            "snapshots": self.snapshots,
+            "reads": self.reads,
+            "reads_saved": UNBATCHED_READS * self.snapshots - self.reads,
+        }
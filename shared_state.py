@@ -0,0 +1,128 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  shared_state.py
+#
+# DESCRIPTION
+#    This code is the shared memory block used between the web server and the
+#    controller process when the car runs in isolated controller mode. The
+#    web server writes the command (target speed, mode and emergency stop),
+#    and the controller writes the status (the latest sensor snapshot and
+#    motor command).
+#
+# NOTES
+#    Each half of the block is protected by a seqlock. There is one writer
+#    per half, which bumps the sequence number to odd before writing and back
+#    to even after, and readers retry until they see the same even number
+#    before and after reading. Readers never block the writer, so a busy web
+#    server can't hold up a control tick. If the writer dies in the middle of
+#    a write the sequence number stays odd, so readers give up after a
+#    timeout and raise TimeoutError.
+#
+# *****************************************************************************
+
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+SEQ_FORMAT = struct.Struct("<I")
+SEQ_MASK = 0xFFFFFFFF
+READ_TIMEOUT = 0.05  # s
+
+# speed, automatic, estop
+COMMAND_FORMAT = struct.Struct("<iBB")
+# ticks, tick_time, ir1, ir2, latched, direction, duty1, duty2, distance,
+# overruns
+STATUS_FORMAT = struct.Struct("<QdBBBbfffI")
+
+# Keep the two halves on separate cache lines
+COMMAND_OFFSET = 0
+STATUS_OFFSET = 64
+BLOCK_SIZE = 128
+
+Command = namedtuple("Command", "speed automatic estop")
+Status = namedtuple("Status", "ticks tick_time ir1 ir2 latched direction "
+                              "duty1 duty2 distance overruns")
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is one seqlock protected record in shared memory.
+# -----------------------------------------------------------------------------
+
+
+class SeqlockRegion:
+    def __init__(self, buf, offset, payload_format):
+        self.buf = buf
+        self.offset = offset
+        self.payload_offset = offset + SEQ_FORMAT.size
+        self.payload_format = payload_format
+
+    def write(self, *values):
+        seq = SEQ_FORMAT.unpack_from(self.buf, self.offset)[0]
+        SEQ_FORMAT.pack_into(self.buf, self.offset, (seq + 1) & SEQ_MASK)
+        self.payload_format.pack_into(self.buf, self.payload_offset, *values)
+        SEQ_FORMAT.pack_into(self.buf, self.offset, (seq + 2) & SEQ_MASK)
+
+    def read(self, timeout=READ_TIMEOUT):
+        deadline = None
+        while True:
+            before = SEQ_FORMAT.unpack_from(self.buf, self.offset)[0]
+            if (not (before & 1)):
+                values = self.payload_format.unpack_from(self.buf,
+                                                         self.payload_offset)
+                after = SEQ_FORMAT.unpack_from(self.buf, self.offset)[0]
+                if (before == after):
+                    return values
+            # Only look at the clock once the first try failed
+            if (deadline is None):
+                deadline = time.perf_counter() + timeout
+            elif (time.perf_counter() > deadline):
+                raise TimeoutError("seqlock writer did not finish writing")
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the shared memory block with the command and the status.
+#   The web server creates it, and the controller process attaches to it by
+#   name.
+# -----------------------------------------------------------------------------
+
+
+class ControlBlock:
+    def __init__(self, name=None):
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=BLOCK_SIZE)
+        self.name = self.shm.name
+        self.command = SeqlockRegion(self.shm.buf, COMMAND_OFFSET,
+                                     COMMAND_FORMAT)
+        self.status = SeqlockRegion(self.shm.buf, STATUS_OFFSET,
+                                    STATUS_FORMAT)
+        if (create):
+            self.write_command(0, False, False)
+
+    def write_command(self, speed, automatic, estop):
+        self.command.write(speed, automatic, estop)
+
+    def read_command(self, timeout=READ_TIMEOUT):
+        return Command(*self.command.read(timeout))
+
+    def write_status(self, ticks, tick_time, ir1, ir2, latched, direction,
+                     duty1, duty2, distance, overruns):
+        self.status.write(ticks, tick_time, ir1, ir2, latched, direction,
+                          duty1, duty2, distance, overruns)
+
+    def read_status(self, timeout=READ_TIMEOUT):
+        return Status(*self.status.read(timeout))
+
+    def close(self):
+        # Drop the regions first, they hold views into the buffer
+        self.command = None
+        self.status = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
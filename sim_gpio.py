@@ -0,0 +1,165 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  sim_gpio.py
+#
+# DESCRIPTION
+#    This code is a simulated stand-in for the RPi.GPIO module. It has the
+#    same functions and constants that the PiCar uses, so project.py can run
+#    on a normal computer without a Raspberry Pi attached. It is selected by
+#    setting the PICAR_SIMULATE environment variable.
+#
+# NOTES
+#    Output pins and PWM duty cycles are recorded, so the motor commands can
+#    be checked. Input pins read whatever was set with set_input, or what the
+#    input source function returns if one is set with set_input_source.
+#
+# *****************************************************************************
+
+import time
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+HIGH = 1
+LOW = 0
+
+# Simulated pin state
+pin_modes = {}
+pin_levels = {}
+pwms = {}
+input_source = None
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class simulates a PWM handle. It records the duty cycle, the time of
+#   the last duty cycle change and how many changes were made.
+# -----------------------------------------------------------------------------
+
+
+class PWM:
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0
+        self.running = False
+        self.change_count = 0
+        self.changed_at = time.perf_counter()
+        pwms[pin] = self
+
+    def start(self, duty):
+        self.running = True
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        if (duty < 0 or duty > 100):
+            raise ValueError("dutycycle must have a value from 0.0 to 100.0")
+        self.duty = duty
+        self.change_count += 1
+        self.changed_at = time.perf_counter()
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.running = False
+        self.duty = 0
+        self.changed_at = time.perf_counter()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   These functions mirror the RPi.GPIO functions used by the PiCar.
+# -----------------------------------------------------------------------------
+
+
+def setmode(mode):
+    pass
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(pin, mode):
+    pin_modes[pin] = mode
+    pin_levels.setdefault(pin, LOW)
+
+
+def output(pin, level):
+    pin_levels[pin] = level
+
+
+def input(pin):
+    if (input_source is not None):
+        return input_source(pin)
+    return pin_levels.get(pin, LOW)
+
+
+def cleanup():
+    pin_modes.clear()
+    pin_levels.clear()
+    pwms.clear()
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function sets the level an input pin reads.
+#
+# INPUT PARAMETERS:
+#   pin - the input pin
+#   level - HIGH or LOW
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def set_input(pin, level):
+    pin_levels[pin] = level
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function sets a function that decides what the input pins read, for
+#   example a simulated track. Passing None goes back to set_input levels.
+#
+# INPUT PARAMETERS:
+#   source - a function taking the pin and returning HIGH or LOW, or None
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def set_input_source(source):
+    global input_source
+    input_source = source
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function returns the current duty cycle of the PWM on a pin.
+#
+# INPUT PARAMETERS:
+#   pin - the PWM pin
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the duty cycle, or 0 if there is no PWM on the pin
+# -----------------------------------------------------------------------------
+
+
+def get_duty(pin):
+    pwm = pwms.get(pin)
+    if (pwm is None or not pwm.running):
+        return 0
+    return pwm.duty
@@ -0,0 +1,46 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  conftest.py
+#
+# DESCRIPTION
+#    This code sets up the tests. They run project.py on the simulated GPIO
+#    from sim_gpio.py, so no Raspberry Pi is needed:
+#
+#        python -m pytest tests
+#
+# *****************************************************************************
+
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("PICAR_SIMULATE", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim_gpio  # noqa: E402
+import project  # noqa: E402
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This fixture sets up the simulated GPIO and puts the car back in manual
+#   mode, stopped and with the deadman disarmed.
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def car():
+    sim_gpio.cleanup()
+    project.setup_gpio()
+    project.global_state.update(mode="manual", speed=100,
+                                avoiding_object=False, estop_latched=False)
+    project.global_links.clear()
+    project.global_driver = project.DEFAULT_CLIENT
+    yield project
+    project.global_state.update(mode="manual", estop_latched=False)
+    project.global_links.clear()
+    project.global_driver = project.DEFAULT_CLIENT
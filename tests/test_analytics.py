@@ -0,0 +1,66 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_analytics.py
+#
+# DESCRIPTION
+#    These tests check that analytics.py keeps the sessions in a run log
+#    apart.
+#
+# *****************************************************************************
+
+import pytest
+
+import analytics
+from run_log import RunLogger, FORWARD
+
+TICK = 0.002
+WHEEL_SPEED = 50.0
+
+
+def write_session(logger, start, seconds, marker=True):
+    if (marker):
+        logger.start_session(start)
+    for i in range(int(seconds / TICK)):
+        logger.log(start + i * TICK, 60.0, 60.0, FORWARD, 0, 0, -1.0)
+
+
+def test_gap_between_sessions_is_not_counted(tmp_path):
+    path = str(tmp_path / "run.log")
+    logger = RunLogger(path)
+    write_session(logger, 1000.0, 1.0)
+    write_session(logger, 1300.0, 1.0)
+    logger.close()
+
+    summary = analytics.summarize(analytics.load_run(path))
+    assert summary["sessions"] == 2
+    assert summary["samples"] == 1000
+    assert abs(summary["duration"] - 2.0) < 0.01
+    # 60% of 50 cm/s for two seconds
+    assert abs(summary["path_length"] - 60.0) < 1.0
+    assert summary["tick"]["max"] < 2 * TICK * analytics.MILLISECONDS
+
+
+def test_reboot_and_logs_without_markers(tmp_path):
+    path = str(tmp_path / "run.log")
+    logger = RunLogger(path)
+    write_session(logger, 5000.0, 1.0, marker=False)
+    # After a reboot the monotonic time starts over
+    write_session(logger, 20.0, 1.0, marker=False)
+    logger.close()
+
+    summary = analytics.summarize(analytics.load_run(path))
+    assert summary["sessions"] == 2
+    assert abs(summary["duration"] - 2.0) < 0.01
+    assert abs(summary["line"]["centered"] - 100.0) < 1e-6
+    assert summary["tick"]["max"] < 2 * TICK * analytics.MILLISECONDS
+
+
+def test_heading_is_wrapped_for_printing():
+    assert analytics.wrap_heading(88147.0) == pytest.approx(-53.0)
+    assert analytics.wrap_heading(180.0) == -180.0
+    assert analytics.wrap_heading(-190.0) == 170.0
+    assert analytics.wrap_heading(45.0) == 45.0
@@ -0,0 +1,71 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_config.py
+#
+# DESCRIPTION
+#    These tests check that load_config only takes settings of the right type
+#    and range, and that a bad file changes nothing.
+#
+# *****************************************************************************
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def settings(car, monkeypatch):
+    for name in ("PWM_FREQUENCY", "UV_MAXIMUM_DISTANCE", "STEER_INNER_RATIO",
+                 "OBSTACLE_AVOIDANCE"):
+        monkeypatch.setattr(car, name, getattr(car, name))
+    return car
+
+
+def write(tmp_path, config):
+    path = tmp_path / "picar_config.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def test_good_settings_are_loaded(settings, tmp_path):
+    settings.load_config(write(tmp_path, {
+        "speed": 70, "pwm_frequency": 200, "uv_maximum_distance": 7.5,
+        "steer_inner_ratio": 0.2, "obstacle_avoidance": True}))
+    assert settings.global_state.current.speed == 70
+    assert settings.PWM_FREQUENCY == 200
+    assert settings.UV_MAXIMUM_DISTANCE == 7.5
+    assert settings.STEER_INNER_RATIO == 0.2
+    assert settings.OBSTACLE_AVOIDANCE is True
+
+
+@pytest.mark.parametrize("config", [
+    {"speed": 150},
+    {"speed": -10},
+    {"speed": 50.5},
+    {"speed": True},
+    {"pwm_frequency": 0},
+    {"pwm_frequency": "200"},
+    {"uv_maximum_distance": -1},
+    {"steer_inner_ratio": 1.5},
+    {"obstacle_avoidance": 1},
+    {"wheel_size": 3},
+    [1, 2, 3],
+])
+def test_bad_settings_are_rejected(settings, tmp_path, config):
+    frequency = settings.PWM_FREQUENCY
+    with pytest.raises(ValueError):
+        settings.load_config(write(tmp_path, config))
+    assert settings.PWM_FREQUENCY == frequency
+    assert settings.global_state.current.speed == 100
+
+
+def test_one_bad_setting_changes_nothing(settings, tmp_path):
+    ratio = settings.STEER_INNER_RATIO
+    with pytest.raises(ValueError, match="uv_maximum_distance"):
+        settings.load_config(write(tmp_path, {
+            "steer_inner_ratio": 0.4, "uv_maximum_distance": 1000}))
+    assert settings.STEER_INNER_RATIO == ratio
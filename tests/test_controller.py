@@ -0,0 +1,107 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_controller.py
+#
+# DESCRIPTION
+#    These tests check the isolated controller mode shared memory, without a
+#    controller process running.
+#
+# *****************************************************************************
+
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+
+import project
+from shared_state import ControlBlock, SEQ_FORMAT, STATUS_OFFSET
+
+
+@pytest.fixture
+def block(car):
+    block = ControlBlock()
+    car.global_control_block = block
+    yield block
+    car.global_control_block = None
+    block.close()
+    block.unlink()
+
+
+def test_unconfirmed_estop_is_reported(car, block):
+    unconfirmed = car.global_estop_unconfirmed
+    start = time.perf_counter()
+    assert car.emergency_stop() is False
+    assert time.perf_counter() - start < 2 * car.CONTROLLER_ACK_TIMEOUT
+    status = car.estop_status()
+    assert status["requested"] is True
+    assert status["latched"] is False
+    assert status["unconfirmed"] == unconfirmed
+
+
+def test_confirmed_estop(car, block):
+    block.write_status(1, 0.0, 0, 0, True, 1, 0.0, 0.0, -1.0, 0)
+    assert car.emergency_stop() is True
+    assert car.estop_status()["latched"] is True
+
+
+def test_read_gives_up_on_a_dead_writer(block):
+    # A writer that died in the middle of a write leaves the sequence odd
+    SEQ_FORMAT.pack_into(block.shm.buf, STATUS_OFFSET, 1)
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        block.read_status(0.01)
+    assert time.perf_counter() - start < 0.5
+
+
+def start_and_die(name, pipe):
+    # Stands in for the web server: starts the controller and is killed
+    controller = multiprocessing.Process(target=project.controller_process,
+                                         args=(name, os.getpid()),
+                                         daemon=True)
+    controller.start()
+    pipe.send(controller.pid)
+    pipe.recv()
+    os._exit(0)
+
+
+def wait_for_status(block, test, timeout):
+    deadline = time.perf_counter() + timeout
+    while (time.perf_counter() < deadline):
+        status = block.read_status()
+        if (test(status)):
+            return status
+        time.sleep(0.01)
+    return None
+
+
+def test_controller_stops_the_car_when_the_server_dies(block):
+    block.write_command(50, False, False)
+    pipe, server_pipe = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=start_and_die,
+                                     args=(block.name, server_pipe))
+    server.start()
+    controller_pid = pipe.recv()
+    try:
+        assert wait_for_status(block, lambda status: status.duty1 == 50,
+                               1.0) is not None
+        pipe.send("die")
+        server.join(1.0)
+        status = wait_for_status(block, lambda status: status.duty1 == 0,
+                                 1.0)
+        assert status is not None
+        # And it stopped running
+        time.sleep(3 * project.PARENT_CHECK_PERIOD)
+        assert block.read_status().ticks == status.ticks
+    finally:
+        server.kill()
+        # Don't leave it driving if the test failed
+        try:
+            os.kill(controller_pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
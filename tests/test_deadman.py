@@ -0,0 +1,124 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_deadman.py
+#
+# DESCRIPTION
+#    These tests check the heartbeat deadman on the simulated GPIO. The
+#    watchdog is stepped with a made up clock, one HEARTBEAT_CHECK_PERIOD at
+#    a time, the same way heartbeat_watchdog_thread runs it.
+#
+# *****************************************************************************
+
+import io
+from wsgiref.util import setup_testing_defaults
+
+import bottle
+import pytest
+
+import sim_gpio
+
+
+def duties(project):
+    return (sim_gpio.get_duty(project.ENABLE_1_PIN),
+            sim_gpio.get_duty(project.ENABLE_2_PIN))
+
+
+def post(path, body):
+    environ = {"REQUEST_METHOD": "POST", "PATH_INFO": path,
+               "CONTENT_TYPE": "application/x-www-form-urlencoded",
+               "CONTENT_LENGTH": str(len(body)),
+               "wsgi.input": io.BytesIO(body.encode())}
+    setup_testing_defaults(environ)
+    return b"".join(bottle.default_app()(
+        environ, lambda status, headers, exc_info=None: None))
+
+
+def run_watchdog(project, start, seconds):
+    # Returns the clock time of the first trip, or None
+    checks = int(seconds / project.HEARTBEAT_CHECK_PERIOD) + 1
+    for i in range(1, checks + 1):
+        now = start + i * project.HEARTBEAT_CHECK_PERIOD
+        if (project.check_heartbeat(now)):
+            return now
+    return None
+
+
+def test_disarmed_until_the_first_heartbeat(car):
+    car.drive_speed(60)
+    assert run_watchdog(car, 0.0, 3 * car.HEARTBEAT_TIMEOUT) is None
+    assert duties(car) == (60, 60)
+
+
+def test_heartbeats_keep_the_car_going(car):
+    car.drive_speed(60)
+    for i in range(20):
+        now = i * car.HEARTBEAT_PERIOD
+        car.record_heartbeat(-1, now)
+        assert not car.check_heartbeat(now + car.HEARTBEAT_PERIOD / 2)
+    assert duties(car) == (60, 60)
+
+
+def test_deadman_stops_within_the_bound(car):
+    trips = car.link_stats()["deadman_trips"]
+    car.drive_speed(60)
+    car.record_heartbeat(-1, 100.0)
+    tripped = run_watchdog(car, 100.0, 2 * car.HEARTBEAT_TIMEOUT)
+    assert tripped is not None
+    assert tripped - 100.0 > car.HEARTBEAT_TIMEOUT
+    assert duties(car) == (0, 0)
+    assert car.global_state.current.mode == "manual"
+
+    stats = car.link_stats()
+    assert not stats["armed"]
+    assert stats["deadman_trips"] == trips + 1
+    assert stats["deadman_last_detection_ms"] <= stats["detection_bound_ms"]
+
+
+def test_other_pages_do_not_keep_the_car_going(car):
+    car.set_driver("phone")
+    car.drive_speed(60)
+    car.record_heartbeat(-1, 100.0, "phone")
+    # A second page left open on a laptop keeps sending heartbeats
+    now = 100.0
+    tripped = None
+    while (tripped is None and now < 100.0 + 2 * car.HEARTBEAT_TIMEOUT):
+        now += car.HEARTBEAT_CHECK_PERIOD
+        car.record_heartbeat(-1, now, "laptop")
+        if (car.check_heartbeat(now)):
+            tripped = now
+    assert tripped is not None
+    assert tripped - 100.0 <= (car.HEARTBEAT_TIMEOUT +
+                               car.HEARTBEAT_CHECK_PERIOD)
+    assert duties(car) == (0, 0)
+
+
+def test_rtt_jitter_is_per_client(car):
+    for i in range(20):
+        car.record_heartbeat(0.010, i * car.HEARTBEAT_PERIOD, "phone")
+        car.record_heartbeat(0.200, i * car.HEARTBEAT_PERIOD, "laptop")
+    phone = car.link_stats("phone")
+    assert phone["heartbeats"] == 20
+    assert phone["rtt_jitter_ms"] == 0
+    assert phone["rtt_mean_ms"] == pytest.approx(10)
+    assert car.link_stats("laptop")["rtt_mean_ms"] == pytest.approx(200)
+
+
+def test_silent_viewers_are_forgotten(car):
+    car.set_driver("phone")
+    car.record_heartbeat(-1, 0.0, "laptop")
+    car.record_heartbeat(-1, 0.0, "phone")
+    car.check_heartbeat(car.LINK_FORGET_TIME + 1)
+    assert car.link_stats()["clients"] == 1
+
+
+def test_the_page_that_drives_is_the_driver(car):
+    post("/heartbeat", "client=laptop&seq=1&rtt=-1")
+    post("/set_speed", "client=phone&speed=40")
+    assert car.link_stats()["client"] == "phone"
+    assert not car.link_stats()["armed"]
+    post("/heartbeat", "client=phone&seq=1&rtt=-1")
+    assert car.link_stats()["armed"]
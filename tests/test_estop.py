@@ -0,0 +1,91 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_estop.py
+#
+# DESCRIPTION
+#    These tests check the emergency stop latch and resume on the simulated
+#    GPIO.
+#
+# *****************************************************************************
+
+import sys
+import threading
+
+import sim_gpio
+
+THREADS = 8
+STOPS = 2000
+
+
+def duties(project):
+    return (sim_gpio.get_duty(project.ENABLE_1_PIN),
+            sim_gpio.get_duty(project.ENABLE_2_PIN))
+
+
+def test_estop_stops_the_motors(car):
+    car.drive_speed(80)
+    assert duties(car) == (80, 80)
+    car.emergency_stop()
+    assert duties(car) == (0, 0)
+    state = car.global_state.current
+    assert state.estop_latched
+    assert state.mode == "manual"
+    assert (state.duty1, state.duty2) == (0, 0)
+
+
+def test_latch_ignores_motor_commands(car):
+    car.emergency_stop()
+    car.drive_speed(60)
+    car.move_left(60)
+    car.automatic_step()
+    assert duties(car) == (0, 0)
+
+
+def test_resume_keeps_the_gpio_set_up(car):
+    pwm = car.global_state.current.motor_pwm1
+    car.emergency_stop()
+    car.resume()
+    state = car.global_state.current
+    assert not state.estop_latched
+    assert state.speed == 0
+    assert duties(car) == (0, 0)
+    car.drive_speed(50)
+    assert duties(car) == (50, 50)
+    assert car.global_state.current.motor_pwm1 is pwm
+
+
+def test_only_applied_motor_commands_are_counted(car):
+    before = car.global_motor_commands
+    car.drive_speed(40)
+    car.emergency_stop()
+    car.drive_speed(60)
+    assert car.global_motor_commands == before + 1
+
+
+def test_concurrent_stops_are_all_counted(car):
+    count = car.global_estop_count
+    unconfirmed = car.global_estop_unconfirmed
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=record_stops, args=(car, i % 2))
+                   for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    status = car.estop_status()
+    assert status["count"] == count + THREADS // 2 * STOPS
+    assert status["unconfirmed"] == unconfirmed + THREADS // 2 * STOPS
+    assert status["max_latency_ms"] >= (STOPS - 1) * car.MILLISECONDS / 1000
+
+
+def record_stops(car, confirmed):
+    for i in range(STOPS):
+        car.record_estop(confirmed, i / 1000)
@@ -0,0 +1,138 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_event_bus.py
+#
+# DESCRIPTION
+#    These tests check the car state store and the mode switching.
+#
+# *****************************************************************************
+
+import random
+import threading
+import time
+
+from event_bus import EventBus, StateStore, CarState, StateChanged
+
+# Each writer counts up its own field, so in the order the changes were made
+# every field only goes up.
+FIELDS = ("speed", "duty1", "duty2", "distance")
+UPDATES = 500
+SWITCHES = 8
+
+
+class SlowBus(EventBus):
+    # Gives the other writers a chance to run just before each publish
+    def publish(self, event):
+        time.sleep(random.random() * 0.0001)
+        EventBus.publish(self, event)
+
+
+def test_state_changes_arrive_in_order():
+    bus = SlowBus()
+    store = StateStore(CarState(
+        mode="manual", speed=0, avoiding_object=False, estop_latched=False,
+        motor_pwm1=None, motor_pwm2=None, duty1=0, duty2=0, direction=1,
+        distance=0), bus)
+    received = []
+    done = threading.Event()
+
+    def on_change(event):
+        received.append(event.state)
+        if (len(received) == len(FIELDS) * UPDATES):
+            done.set()
+
+    bus.subscribe(StateChanged, on_change)
+
+    def writer(field):
+        for i in range(1, UPDATES + 1):
+            store.update(**{field: i})
+
+    threads = [threading.Thread(target=writer, args=(field,))
+               for field in FIELDS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert done.wait(5)
+    assert received[-1] is store.current
+    for field in FIELDS:
+        values = [getattr(state, field) for state in received]
+        assert values == sorted(values)
+
+
+def test_manual_right_after_automatic_stops_the_loop(car, monkeypatch):
+    loop = car.switch_automatic
+
+    def late_loop():
+        # The manual request lands before the loop thread gets going
+        time.sleep(0.05)
+        loop()
+
+    monkeypatch.setattr(car, "switch_automatic", late_loop)
+    switch = threading.Thread(target=lambda: (
+        car.apply_mode("automatic"), car.apply_mode("manual")))
+    switch.start()
+    switch.join(2)
+    stuck = switch.is_alive()
+    car.global_state.update(mode="manual")
+    assert not stuck
+    assert car.global_state.current.mode == "manual"
+
+
+def test_concurrent_switches_start_one_loop(car, monkeypatch):
+    loops = []
+    update = car.global_state.update
+
+    def slow_update(**changes):
+        # Gives the other handlers a chance to run after the alive check
+        time.sleep(0.01)
+        return update(**changes)
+
+    def counted_loop():
+        loops.append(threading.current_thread())
+        while (car.global_state.current.mode == "automatic"):
+            time.sleep(0.001)
+
+    monkeypatch.setattr(car.global_state, "update", slow_update)
+    monkeypatch.setattr(car, "switch_automatic", counted_loop)
+    start = threading.Barrier(SWITCHES)
+
+    def switch(mode):
+        start.wait()
+        car.apply_mode(mode)
+
+    try:
+        handlers = [threading.Thread(target=switch, args=("automatic",))
+                    for i in range(SWITCHES)]
+        for handler in handlers:
+            handler.start()
+        for handler in handlers:
+            handler.join()
+        assert len(loops) == 1
+
+        errors = []
+        start = threading.Barrier(SWITCHES)
+        handlers = [threading.Thread(target=lambda: errors.append(
+            catch(switch, "manual"))) for i in range(SWITCHES)]
+        for handler in handlers:
+            handler.start()
+        for handler in handlers:
+            handler.join()
+        assert errors == [None] * SWITCHES
+        assert car.global_automatic_thread is None
+    finally:
+        update(mode="manual")
+        for loop in loops:
+            loop.join(1)
+
+
+def catch(function, *args):
+    try:
+        function(*args)
+    except Exception as e:
+        return e
+    return None
@@ -0,0 +1,57 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_obstacles.py
+#
+# DESCRIPTION
+#    These tests check that the obstacles on the simulated track stay in
+#    place whatever the car does, so hitting one never saves time.
+#
+# *****************************************************************************
+
+import pytest
+
+import track_sim
+
+SPEED = 80
+MAX_LAP_TIME = 40.0
+
+
+@pytest.fixture
+def avoidance(car, monkeypatch):
+    monkeypatch.setattr(car, "OBSTACLE_AVOIDANCE", True)
+    monkeypatch.setattr(car, "UV_MAXIMUM_DISTANCE", car.UV_MAXIMUM_DISTANCE)
+    return car
+
+
+def run(obstacles):
+    return track_sim.run_laps(1, SPEED, obstacles=obstacles,
+                              max_lap_time=MAX_LAP_TIME)
+
+
+def test_a_permanent_obstacle_blocks_the_car(avoidance):
+    avoidance.UV_MAXIMUM_DISTANCE = 0
+    world = run(((60.0, 1, None),))
+    assert world.lap_times == []
+    assert world.collisions == 1
+    assert world.blocked_time > MAX_LAP_TIME
+
+
+def test_a_collision_costs_time(avoidance):
+    clear = run(())
+    avoidance.UV_MAXIMUM_DISTANCE = 0
+    hit = run(((60.0, 1, 4.0),))
+    assert hit.collisions == 1
+    assert hit.lap_times[0] > clear.lap_times[0] + 2.0
+    assert hit.blocked_time > 2.0
+
+
+def test_avoiding_an_obstacle_is_scored_as_blocked(avoidance):
+    avoidance.UV_MAXIMUM_DISTANCE = 5
+    world = run(((60.0, 1, 4.0),))
+    assert world.collisions == 0
+    assert len(world.lap_times) == 1
+    assert world.blocked_time > 0
@@ -0,0 +1,133 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_realtime.py
+#
+# DESCRIPTION
+#    These tests check the jitter recorder and the tick timer. The timer runs
+#    on a made up clock, so the tests don't depend on how busy the computer
+#    is.
+#
+# *****************************************************************************
+
+import pytest
+
+import realtime
+from realtime import JitterRecorder, TickTimer, HISTOGRAM_BUCKETS
+
+US = 1 / realtime.MICROSECONDS
+PERIOD = 0.002
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 100.0
+        self.oversleep = 0.0
+        self.sleeps = 0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps += 1
+        self.now += delay + self.oversleep
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(realtime, "time", clock)
+    return clock
+
+
+def test_percentiles():
+    recorder = JitterRecorder()
+    for i in range(100, 0, -1):
+        recorder.record(i * US)
+    stats = recorder.stats()
+    assert stats["count"] == 100
+    assert stats["p50_us"] == pytest.approx(51)
+    assert stats["p99_us"] == pytest.approx(100)
+    assert stats["max_us"] == pytest.approx(100)
+
+
+def test_no_samples():
+    assert JitterRecorder().stats() == {"count": 0, "p50_us": 0.0,
+                                        "p99_us": 0.0, "max_us": 0.0}
+
+
+def test_percentiles_only_use_the_kept_samples():
+    recorder = JitterRecorder(capacity=4)
+    recorder.record(1000 * US)
+    for i in range(9):
+        recorder.record(10 * US)
+    stats = recorder.stats()
+    assert stats["count"] == 10
+    assert stats["p99_us"] == pytest.approx(10)
+    # The maximum is over every sample, also the ones overwritten
+    assert stats["max_us"] == pytest.approx(1000)
+
+
+def test_histogram_buckets():
+    recorder = JitterRecorder()
+    for error in (0.0, 0.5 * US, 1 * US, 3 * US, 4 * US, 1000 * US, 10.0):
+        recorder.record(error)
+    rows = recorder.histogram()
+    assert len(rows) == HISTOGRAM_BUCKETS
+    assert rows[0] == (0, 1, 2)
+    assert rows[1] == (1, 2, 1)
+    assert rows[2] == (2, 4, 1)
+    assert rows[3] == (4, 8, 1)
+    assert rows[10] == (512, 1024, 1)
+    # Anything longer goes into the last bucket
+    assert rows[-1][2] == 1
+    assert sum(count for low, high, count in rows) == 7
+
+
+def test_reset():
+    recorder = JitterRecorder()
+    recorder.record(5 * US)
+    recorder.reset()
+    assert recorder.stats()["count"] == 0
+    assert sum(recorder.buckets) == 0
+
+
+def test_ticks_on_time(clock):
+    recorder = JitterRecorder()
+    timer = TickTimer(PERIOD, recorder)
+    start = clock.now
+    for i in range(10):
+        timer.wait()
+    assert clock.now == pytest.approx(start + 10 * PERIOD)
+    assert timer.overruns == 0
+    assert recorder.stats()["max_us"] == pytest.approx(0, abs=1e-3)
+
+
+def test_late_wake_up_is_recorded_but_not_an_overrun(clock):
+    recorder = JitterRecorder()
+    timer = TickTimer(PERIOD, recorder)
+    clock.oversleep = 300 * US
+    timer.wait()
+    assert timer.overruns == 0
+    assert recorder.stats()["max_us"] == pytest.approx(300)
+    # The next tick stays on the schedule
+    assert timer.next_tick == pytest.approx(100.0 + 2 * PERIOD)
+
+
+def test_overrun_starts_again_from_now(clock):
+    recorder = JitterRecorder()
+    timer = TickTimer(PERIOD, recorder)
+    # The tick's work took two and a half periods
+    clock.now += 2.5 * PERIOD
+    timer.wait()
+    assert timer.overruns == 1
+    assert clock.sleeps == 0
+    assert recorder.stats()["max_us"] == pytest.approx(1.5 * PERIOD / US)
+    # No burst of late ticks to catch up
+    assert timer.next_tick == pytest.approx(clock.now + PERIOD)
+    timer.wait()
+    assert timer.overruns == 1
+    assert clock.sleeps == 1
@@ -0,0 +1,80 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_sensors.py
+#
+# DESCRIPTION
+#    These tests check the infrared sensor snapshots and filters on the
+#    simulated GPIO.
+#
+# *****************************************************************************
+
+from array import array
+
+import pytest
+
+import sim_gpio
+from sensors import (IrSensorReader, MAJORITY, DEBOUNCE, GPIO_MEMORY_SIZE,
+                     GPLEV0_OFFSET)
+
+PIN_1 = 4
+PIN_2 = 5
+
+
+def reader(filter_type, samples=3):
+    return IrSensorReader(sim_gpio, PIN_1, PIN_2, use_registers=False,
+                          filter_type=filter_type, samples=samples)
+
+
+def feed(sensors, levels):
+    bits = []
+    for level in levels:
+        sim_gpio.set_input(PIN_1, level)
+        bits.append(sensors.read().ir_1)
+    return bits
+
+
+def test_majority_ignores_single_glitches():
+    assert feed(reader(MAJORITY), [1, 0, 1, 1, 0, 1, 0, 0, 0]) == \
+        [0, 0, 1, 1, 1, 1, 0, 0, 0]
+
+
+def test_debounce_waits_for_a_steady_change():
+    assert feed(reader(DEBOUNCE), [1, 0, 1, 1, 1, 0, 1, 1]) == \
+        [0, 0, 0, 0, 1, 1, 1, 1]
+
+
+def test_reads_are_counted_per_snapshot():
+    sensors = reader(None)
+    feed(sensors, [0, 1, 0])
+    assert sensors.stats()["snapshots"] == 3
+    assert sensors.stats()["reads"] == 6
+    assert sensors.stats()["reads_saved"] == 0
+
+
+def test_batched_read_saves_a_read_per_snapshot():
+    sensors = reader(None)
+    registers = array("I", [0]) * (GPIO_MEMORY_SIZE // 4)
+    sensors.registers = memoryview(registers)
+    levels = GPLEV0_OFFSET // 4
+    for bits in (0, 1, 2, 3):
+        registers[levels] = (((bits & 1) << PIN_1) |
+                             ((bits >> 1) << PIN_2))
+        assert sensors.read().bits == bits
+    stats = sensors.stats()
+    assert stats["batched"]
+    assert stats["snapshots"] == 4
+    assert stats["reads"] == 4
+    assert stats["reads_saved"] == 4
+
+
+def test_filter_needs_at_least_one_sample(car, monkeypatch):
+    with pytest.raises(ValueError):
+        reader(MAJORITY, samples=0)
+    monkeypatch.setenv("PICAR_IR_FILTER", MAJORITY)
+    monkeypatch.setenv("PICAR_IR_FILTER_SAMPLES", "0")
+    with pytest.raises(ValueError):
+        car.setup_gpio()
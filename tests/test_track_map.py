@@ -0,0 +1,89 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  test_track_map.py
+#
+# DESCRIPTION
+#    These tests check that the learned track map is measured with the real
+#    time of each control tick, on the simulated track.
+#
+# *****************************************************************************
+
+import track_sim
+from run_log import BACKWARD
+from track_map import (TrackFollower, TrackMap, FOLLOWING, LEARNING,
+                       STRAIGHT, LEFT)
+
+SPEED = 60
+TICK = track_sim.project.CONTROL_TICK_PERIOD
+
+
+def learn(late_ticks):
+    follower = TrackFollower(None, track_sim.project.CONTROL_TICK_PERIOD)
+    world = track_sim.run_laps(3, SPEED, follower, late_ticks=late_ticks)
+    return follower, world
+
+
+def test_late_ticks_do_not_shrink_the_map(car):
+    on_time, world = learn(0.0)
+    late, late_world = learn(0.1)
+    assert late.state == FOLLOWING
+    assert not late_world.crashed
+    assert (abs(late.track_map.length - on_time.track_map.length) <
+            0.05 * on_time.track_map.length)
+    # The learned laps are still faster than the first one
+    assert max(late_world.lap_times[1:]) < late_world.lap_times[0]
+
+
+def test_position_only_moves_forward_along_the_line(car):
+    follower = TrackFollower(None, car.CONTROL_TICK_PERIOD)
+    car.global_track_follower = follower
+    try:
+        car.drive_speed(50)
+        car.automatic_step(1.0)
+        car.automatic_step(1.1)
+        moved = follower.position
+        assert moved > 0
+        car.global_state.update(avoiding_object=True)
+        car.automatic_step(1.2)
+        car.global_state.update(avoiding_object=False, direction=BACKWARD)
+        car.automatic_step(1.3)
+        assert follower.position == moved
+    finally:
+        car.global_track_follower = None
+
+
+def test_start_line_bounce_does_not_end_the_lap(tmp_path):
+    path = tmp_path / "map.json"
+    follower = TrackFollower(str(path), TICK)
+    now = 0.0
+    # Crossing the tape, the sensors flicker
+    for ir_1, ir_2 in ((1, 1), (1, 0), (1, 1), (0, 0), (1, 1), (0, 0)):
+        now += TICK
+        follower.update(ir_1, ir_2, 60, 60, now)
+    assert follower.state == LEARNING
+    assert follower.laps == 1
+    assert follower.track_map is None
+    assert not path.exists()
+
+
+def test_a_short_learned_lap_is_thrown_away(tmp_path):
+    path = tmp_path / "map.json"
+    TrackMap([(STRAIGHT, 3.0), (LEFT, 2.0)]).save(str(path))
+    cached = path.read_text()
+    follower = TrackFollower(str(path), TICK)
+    follower.state = LEARNING
+    follower.runs = [[STRAIGHT, 0.0024]]
+    follower.start_lap()
+    assert follower.state == LEARNING
+    assert follower.track_map.length == 5.0
+    assert path.read_text() == cached
+
+
+def test_a_short_cached_map_is_not_used(tmp_path):
+    path = tmp_path / "map.json"
+    TrackMap([(STRAIGHT, 0.0024)]).save(str(path))
+    assert TrackFollower(str(path), TICK).track_map is None
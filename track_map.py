@@ -0,0 +1,301 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  track_map.py
+#
+# DESCRIPTION
+#    This code learns the track while the car follows the line in automatic
+#    mode, so later laps can go faster. During the first lap the infrared
+#    sensor readings are turned into a map of straights and turns, with the
+#    length of each. The map is saved to disk, and on the next laps a speed
+#    profile made from it runs the straights fast and slows down ahead of
+#    each turn. Steering still comes from the sensors, only the speed is
+#    planned.
+#
+# NOTES
+#    A lap starts and ends at the start line, a black line across the track
+#    that both sensors see at once. The sensors can flicker while crossing
+#    the tape, so the start line is ignored until the car has gone
+#    MIN_LAP_LENGTH from the last one, and a learned map shorter than that is
+#    thrown away instead of saved.
+#
+#    Lengths are in seconds at full duty cycle, which is the time the car
+#    would take at 100% speed. They are worked out from the duty cycle and
+#    the measured time of each control tick, so they don't depend on the
+#    speed the lap was learned at, or on ticks that ran late.
+#
+#    If the sensors stop matching the map (the track was changed, or the car
+#    lost its place), the car goes back to plain line following until the
+#    next start line. After MAX_MISSED_LAPS laps in a row like that the map
+#    is learned again.
+#
+# *****************************************************************************
+
+import json
+import os
+
+STRAIGHT = "S"
+LEFT = "L"
+RIGHT = "R"
+
+SENSED_BLACK = 1
+FULL_DUTY = 100.0
+
+# How far back the turn classifier looks, and how much of it has to be
+# correcting one way to call it a turn.
+CLASSIFY_LENGTH = 0.15
+TURN_THRESHOLD = 0.1
+# Pieces of track shorter than this are merged into their neighbour
+MIN_SEGMENT_LENGTH = 0.3
+# Start slowing down this far ahead of a turn
+BRAKE_LENGTH = 0.25
+STRAIGHT_SPEED = 100
+# How far off the map can be before it counts as a mismatch
+BOUNDARY_MARGIN = 0.2
+MISMATCH_LENGTH = 0.3
+LAP_TOLERANCE = 0.15
+MAX_MISSED_LAPS = 2
+# No lap is shorter than this
+MIN_LAP_LENGTH = 1.0
+# A longer time between updates means the control loop was stopped, and the
+# update counts as one tick
+MAX_STEP_TIME = 0.25
+
+# Follower states
+WAITING = "waiting"
+LEARNING = "learning"
+FOLLOWING = "following"
+REACTIVE = "reactive"
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class decides whether the car is on a straight or in a turn from
+#   the sensor readings. In a turn the line keeps drifting to one side, so
+#   most of the corrections are the same way. The corrections are averaged
+#   over the last CLASSIFY_LENGTH of track.
+# -----------------------------------------------------------------------------
+
+
+class TurnClassifier:
+    def __init__(self):
+        self.average = 0.0
+
+    def update(self, ir_1, ir_2, step):
+        if (ir_1 == SENSED_BLACK and ir_2 != SENSED_BLACK):
+            signal = 1.0
+        elif (ir_2 == SENSED_BLACK and ir_1 != SENSED_BLACK):
+            signal = -1.0
+        else:
+            signal = 0.0
+        self.average += (signal - self.average) * min(1.0,
+                                                      step / CLASSIFY_LENGTH)
+        if (self.average > TURN_THRESHOLD):
+            return LEFT
+        if (self.average < -TURN_THRESHOLD):
+            return RIGHT
+        return STRAIGHT
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the learned map of the track, a list of segments. Each
+#   segment is the kind (STRAIGHT, LEFT or RIGHT) and its length.
+# -----------------------------------------------------------------------------
+
+
+class TrackMap:
+    def __init__(self, segments):
+        self.segments = segments
+        self.length = sum(length for kind, length in segments)
+
+    @staticmethod
+    def from_runs(runs):
+        # Merge short pieces into the one before, then join neighbours of
+        # the same kind.
+        segments = []
+        for kind, length in runs:
+            if (segments and (length < MIN_SEGMENT_LENGTH or
+                              segments[-1][0] == kind)):
+                segments[-1][1] += length
+            else:
+                segments.append([kind, length])
+        if (len(segments) > 1 and segments[0][1] < MIN_SEGMENT_LENGTH):
+            segments[1][1] += segments[0][1]
+            segments.pop(0)
+        merged = []
+        for kind, length in segments:
+            if (merged and merged[-1][0] == kind):
+                merged[-1] = (kind, merged[-1][1] + length)
+            else:
+                merged.append((kind, length))
+        return TrackMap(merged)
+
+    @staticmethod
+    def load(path):
+        with open(path) as file:
+            data = json.load(file)
+        return TrackMap([(kind, length) for kind, length in data["segments"]])
+
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump({"segments": self.segments, "length": self.length},
+                      file, indent=2)
+
+    def kind_at(self, position):
+        end = 0.0
+        for kind, length in self.segments:
+            end += length
+            if (position < end):
+                return kind
+        return self.segments[-1][0]
+
+    def near_boundary(self, position):
+        end = 0.0
+        for kind, length in self.segments:
+            if (abs(position - end) < BOUNDARY_MARGIN):
+                return True
+            end += length
+        return abs(position - end) < BOUNDARY_MARGIN
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the speed profile worked out from a track map. It is a list
+#   of zones, each the position it ends at and whether the car can go fast
+#   there. Straights are fast, except for the last BRAKE_LENGTH before a
+#   turn. Looking up a speed only moves forward through the zones, so it is
+#   cheap to do every control tick.
+# -----------------------------------------------------------------------------
+
+
+class SpeedProfile:
+    def __init__(self, track_map):
+        self.zones = []
+        end = 0.0
+        count = len(track_map.segments)
+        for i in range(count):
+            kind, length = track_map.segments[i]
+            end += length
+            if (kind != STRAIGHT):
+                self.zones.append((end, False))
+                continue
+            next_kind = track_map.segments[(i + 1) % count][0]
+            if (next_kind == STRAIGHT or length <= BRAKE_LENGTH):
+                self.zones.append((end, next_kind == STRAIGHT))
+            else:
+                self.zones.append((end - BRAKE_LENGTH, True))
+                self.zones.append((end, False))
+        self.index = 0
+
+    def restart(self):
+        self.index = 0
+
+    def is_fast(self, position):
+        while (self.index < len(self.zones) - 1 and
+               position >= self.zones[self.index][0]):
+            self.index += 1
+        return self.zones[self.index][1]
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class runs the learning and the speed profile for the automatic
+#   mode. It is updated every control tick with the time of the tick, and
+#   returns the speed to drive at. tick_period is the time used for the
+#   first update, and after the control loop was stopped.
+# -----------------------------------------------------------------------------
+
+
+class TrackFollower:
+    def __init__(self, path, tick_period, straight_speed=STRAIGHT_SPEED):
+        self.path = path
+        self.tick_period = tick_period
+        self.straight_speed = straight_speed
+        self.track_map = None
+        self.profile = None
+        if (path is not None and os.path.exists(path)):
+            track_map = TrackMap.load(path)
+            if (track_map.length >= MIN_LAP_LENGTH):
+                self.use_map(track_map)
+        self.state = WAITING
+        self.classifier = TurnClassifier()
+        self.on_start_line = False
+        self.position = 0.0
+        self.runs = []
+        self.mismatch = 0.0
+        self.missed_laps = 0
+        self.laps = 0
+        self.last_time = None
+
+    def use_map(self, track_map):
+        self.track_map = track_map
+        self.profile = SpeedProfile(track_map)
+
+    def start_lap(self):
+        self.laps += 1
+        learned = False
+        if (self.state == LEARNING):
+            track_map = TrackMap.from_runs(self.runs)
+            # Keep learning if the lap was too short to be a real one
+            if (track_map.length >= MIN_LAP_LENGTH):
+                self.use_map(track_map)
+                learned = True
+                if (self.path is not None):
+                    self.track_map.save(self.path)
+        elif (self.state != WAITING):
+            expected = self.track_map.length
+            if (self.state == REACTIVE or
+                    abs(self.position - expected) > expected * LAP_TOLERANCE):
+                self.missed_laps += 1
+            else:
+                self.missed_laps = 0
+
+        if (self.track_map is None or self.missed_laps >= MAX_MISSED_LAPS or
+                (self.state == LEARNING and not learned)):
+            self.state = LEARNING
+            self.missed_laps = 0
+        else:
+            self.state = FOLLOWING
+            self.profile.restart()
+        self.position = 0.0
+        self.runs = []
+        self.mismatch = 0.0
+
+    def update(self, ir_1, ir_2, duty, base_speed, now):
+        # duty is 0 whenever the car is not moving forward along the line
+        dt = self.tick_period
+        if (self.last_time is not None and
+                0 < now - self.last_time <= MAX_STEP_TIME):
+            dt = now - self.last_time
+        self.last_time = now
+        step = duty / FULL_DUTY * dt
+        self.position += step
+        kind = self.classifier.update(ir_1, ir_2, step)
+
+        on_start_line = ir_1 == SENSED_BLACK and ir_2 == SENSED_BLACK
+        if (on_start_line and not self.on_start_line and
+                (self.state == WAITING or
+                 self.position >= MIN_LAP_LENGTH)):
+            self.start_lap()
+        self.on_start_line = on_start_line
+
+        if (self.state == LEARNING):
+            if (self.runs and self.runs[-1][0] == kind):
+                self.runs[-1][1] += step
+            else:
+                self.runs.append([kind, step])
+            return base_speed
+        if (self.state != FOLLOWING or base_speed <= 0):
+            return base_speed
+
+        if (kind != self.track_map.kind_at(self.position) and
+                not self.track_map.near_boundary(self.position)):
+            self.mismatch += step
+            if (self.mismatch > MISMATCH_LENGTH):
+                self.state = REACTIVE
+                return base_speed
+        else:
+            self.mismatch = 0.0
+        if (self.profile.is_fast(self.position)):
+            return max(base_speed, self.straight_speed)
+        return base_speed
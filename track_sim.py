@@ -0,0 +1,394 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  track_sim.py
+#
+# DESCRIPTION
+#    This code simulates the PiCar driving around a line following track.
+#    The automatic mode from project.py runs unchanged on the simulated GPIO:
+#    the simulated track decides what the infrared sensors read, and the car
+#    moves according to the motor duty cycles the automatic mode sets. Time
+#    is simulated too, one control tick at a time, so laps run much faster
+#    than real time.
+#
+#    Running this file compares the lap times of plain line following with
+#    the learned track map:
+#
+#        python track_sim.py --laps 5 --speed 60
+#
+# NOTES
+#    The car is a differential drive with motor 1 on the left and motor 2 on
+#    the right. The motors take MOTOR_TIME_CONSTANT to reach a new speed, and
+#    the tires slide if the car turns harder than MAX_LATERAL_ACCELERATION
+#    allows, so going into a turn too fast runs the car off the line.
+#
+#    The PWM frequency matters in two ways. Every PWM period loses
+#    DRIVER_SWITCHING_TIME of drive to the software PWM and the motor driver
+#    switching, so high frequencies lose speed. At low frequencies the motor
+#    speed ripples within each period, which shakes the car off the line.
+#
+#    With obstacle avoidance on, the ultrasonic sensor is read every
+#    project.ULTRASONIC_PERIOD and the reading goes through the same
+#    avoid_obstacle as on the car. It sees obstacles on the track ahead, and
+#    the wall WALL_CLEARANCE past the start of each turn while the car is on
+#    the straight before it.
+#
+#    An obstacle is put down when the car starts a given lap. It stays for a
+#    set time whatever the car does, like someone stepping onto the track,
+#    or for good if it has no time. The car can't drive through it, so
+#    driving into it counts as a collision and stops the car against it. A
+#    car that hits it again after backing off counts another collision. The
+#    time the car spends backing off or stuck against an obstacle is counted
+#    as blocked time. A permanent obstacle keeps the car backing off and
+#    coming back forever, because the avoidance only backs away.
+#
+# *****************************************************************************
+
+import argparse
+import bisect
+import math
+import os
+import random
+
+os.environ.setdefault("PICAR_SIMULATE", "1")
+import sim_gpio  # noqa: E402
+import project  # noqa: E402
+from track_map import TrackFollower  # noqa: E402
+
+WHEEL_SPEED_AT_FULL_DUTY = 50.0  # cm/s, same as analytics.py
+WHEEL_BASE = 13.0  # cm
+MOTOR_TIME_CONSTANT = 0.15  # s
+MAX_LATERAL_ACCELERATION = 60.0  # cm/s^2
+SENSOR_AHEAD = 8.0  # cm in front of the wheels
+SENSOR_HALF_SPACING = 1.5  # cm either side of the middle of the car
+LINE_WIDTH = 1.8  # cm
+START_LINE_WIDTH = 2.0  # cm
+OFF_TRACK_DISTANCE = 10.0  # cm from the line
+START_BEFORE_LINE = 10.0  # cm
+FULL_DUTY = 100.0
+MAX_LAP_TIME = 60.0  # s
+DRIVER_SWITCHING_TIME = 20e-6  # s of drive lost per PWM period
+ULTRASONIC_RANGE = 100.0  # cm
+WALL_CLEARANCE = 15.0  # cm past the start of a turn
+CONTACT_DISTANCE = 0.5  # cm
+MAX_OVERRUN_TICKS = 10
+
+# A 150 cm by 70 cm oval, driven counterclockwise. Each segment is its length
+# in cm and its curvature in 1/cm, positive for a left turn.
+TURN_RADIUS = 35.0
+OVAL_TRACK = [
+    (150.0, 0.0),
+    (math.pi * TURN_RADIUS, 1 / TURN_RADIUS),
+    (150.0, 0.0),
+    (math.pi * TURN_RADIUS, 1 / TURN_RADIUS),
+]
+
+# A 110 cm by 90 cm rounded rectangle with tighter turns
+CORNER_RADIUS = 25.0
+SQUARE_TRACK = [
+    (60.0, 0.0),
+    (math.pi * CORNER_RADIUS / 2, 1 / CORNER_RADIUS),
+    (40.0, 0.0),
+    (math.pi * CORNER_RADIUS / 2, 1 / CORNER_RADIUS),
+    (60.0, 0.0),
+    (math.pi * CORNER_RADIUS / 2, 1 / CORNER_RADIUS),
+    (40.0, 0.0),
+    (math.pi * CORNER_RADIUS / 2, 1 / CORNER_RADIUS),
+]
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is an obstacle on the track. It is put down when the car
+#   starts the given lap, at a position in cm from the start line, and taken
+#   away after duration seconds, or never if duration is None.
+# -----------------------------------------------------------------------------
+
+
+class Obstacle:
+    def __init__(self, position, lap, duration):
+        self.position = position
+        self.lap = lap
+        self.duration = duration
+        self.placed_at = None
+        self.touching = False
+
+    def present(self, t):
+        return (self.placed_at is not None and
+                (self.duration is None or t < self.placed_at + self.duration))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This class is the simulated track and car. The car's place is kept
+#   relative to the line: how far along the track it is, how far to the left
+#   of the line it is, and its heading relative to the line.
+# -----------------------------------------------------------------------------
+
+
+class TrackWorld:
+    def __init__(self, segments=OVAL_TRACK, obstacles=()):
+        self.segments = segments
+        self.starts = []
+        self.walls = []
+        self.length = 0.0
+        for i, (length, curvature) in enumerate(segments):
+            # A wall is only seen from the straight leading into the turn
+            before_length, before_curvature = segments[i - 1]
+            if (curvature != 0 and before_curvature == 0):
+                self.walls.append((self.length, before_length))
+            self.starts.append(self.length)
+            self.length += length
+        self.obstacles = [Obstacle(position, lap, duration)
+                          for position, lap, duration in obstacles]
+        self.collisions = 0
+        self.blocked_time = 0.0
+        self.s = self.length - START_BEFORE_LINE
+        self.e = 0.0
+        self.psi = 0.0
+        self.left_speed = 0.0
+        self.right_speed = 0.0
+        self.t = 0.0
+        self.lap_start = None
+        self.lap_times = []
+        self.laps_started = 0
+        self.crashed = False
+
+    def curvature(self, s):
+        s = s % self.length
+        return self.segments[bisect.bisect_right(self.starts, s) - 1][1]
+
+    def sensor_offsets(self):
+        # Where the two sensors are to the left of the line
+        middle = (self.e + SENSOR_AHEAD * math.sin(self.psi) -
+                  self.curvature(self.s + SENSOR_AHEAD) *
+                  SENSOR_AHEAD * SENSOR_AHEAD / 2)
+        spread = SENSOR_HALF_SPACING * math.cos(self.psi)
+        return middle + spread, middle - spread
+
+    def input(self, pin):
+        if (pin == project.IR_SENSOR_1_PIN or pin == project.IR_SENSOR_2_PIN):
+            if ((self.s + SENSOR_AHEAD) % self.length < START_LINE_WIDTH):
+                return project.SENSED_BLACK
+            left, right = self.sensor_offsets()
+            offset = left if pin == project.IR_SENSOR_1_PIN else right
+            if (abs(offset) < LINE_WIDTH / 2):
+                return project.SENSED_BLACK
+            return project.SENSED_WHITE
+        return sim_gpio.pin_levels.get(pin, sim_gpio.LOW)
+
+    def active_obstacles(self):
+        return [obstacle for obstacle in self.obstacles
+                if obstacle.present(self.t)]
+
+    def stuck(self):
+        return any(obstacle.touching for obstacle in self.obstacles)
+
+    def gap_to(self, position):
+        # How far ahead of the front of the car a track position is
+        return (position - self.s - SENSOR_AHEAD) % self.length
+
+    def distance(self):
+        # What the ultrasonic sensor reads, 0 if there is no echo
+        readings = []
+        for wall, straight_length in self.walls:
+            gap = self.gap_to(wall)
+            if (gap < min(ULTRASONIC_RANGE, straight_length)):
+                readings.append(gap + WALL_CLEARANCE)
+        for obstacle in self.active_obstacles():
+            gap = self.gap_to(obstacle.position)
+            if (gap < ULTRASONIC_RANGE):
+                readings.append(gap)
+        return min(readings) if readings else 0.0
+
+    def wheel_target(self, a_pin, b_pin, enable_pin):
+        # The mean wheel speed and the PWM ripple around it
+        a = sim_gpio.pin_levels.get(a_pin, sim_gpio.LOW)
+        b = sim_gpio.pin_levels.get(b_pin, sim_gpio.LOW)
+        pwm = sim_gpio.pwms.get(enable_pin)
+        if (a == b or pwm is None):
+            return 0.0, 0.0
+        sign = 1.0 if a == sim_gpio.HIGH else -1.0
+        duty = sim_gpio.get_duty(enable_pin) / FULL_DUTY
+        period = 1.0 / pwm.frequency
+        on = (self.t % period) < duty * period
+        duty = max(0.0, duty - DRIVER_SWITCHING_TIME / period)
+        ripple = ((on - duty) * min(1.0, period / MOTOR_TIME_CONSTANT) *
+                  WHEEL_SPEED_AT_FULL_DUTY)
+        return (sign * duty * WHEEL_SPEED_AT_FULL_DUTY, sign * ripple)
+
+    def step(self, dt):
+        left, left_ripple = self.wheel_target(project.MOTOR_1A_OUT_PIN,
+                                              project.MOTOR_1B_OUT_PIN,
+                                              project.ENABLE_1_PIN)
+        right, right_ripple = self.wheel_target(project.MOTOR_2A_OUT_PIN,
+                                                project.MOTOR_2B_OUT_PIN,
+                                                project.ENABLE_2_PIN)
+        lag = min(1.0, dt / MOTOR_TIME_CONSTANT)
+        self.left_speed += (left - self.left_speed) * lag
+        self.right_speed += (right - self.right_speed) * lag
+        left = self.left_speed + left_ripple
+        right = self.right_speed + right_ripple
+
+        gaps = [(obstacle, self.gap_to(obstacle.position))
+                for obstacle in self.active_obstacles()]
+        v = (left + right) / 2
+        omega = (right - left) / WHEEL_BASE
+        if (v != 0 and abs(v * omega) > MAX_LATERAL_ACCELERATION):
+            omega = math.copysign(MAX_LATERAL_ACCELERATION / abs(v), omega)
+        k = self.curvature(self.s)
+        s_dot = v * math.cos(self.psi) / (1 - k * self.e)
+        self.e += v * math.sin(self.psi) * dt
+        self.psi += (omega - k * s_dot) * dt
+        self.s += s_dot * dt
+        self.t += dt
+
+        if (self.s >= self.length):
+            self.s -= self.length
+            if (self.lap_start is not None):
+                self.lap_times.append(self.t - self.lap_start)
+            self.lap_start = self.t
+            self.laps_started += 1
+            for obstacle in self.obstacles:
+                if (obstacle.lap == self.laps_started):
+                    obstacle.placed_at = self.t
+        if (abs(self.e) > OFF_TRACK_DISTANCE):
+            self.crashed = True
+
+        for obstacle in self.obstacles:
+            if (not obstacle.present(self.t)):
+                obstacle.touching = False
+        for obstacle, gap in gaps:
+            new_gap = self.gap_to(obstacle.position)
+            if (new_gap > gap + self.length / 2):
+                # The front of the car would have gone through it, so it
+                # stops against it instead
+                self.s -= self.length - new_gap + CONTACT_DISTANCE / 2
+                self.left_speed = 0.0
+                self.right_speed = 0.0
+                if (not obstacle.touching):
+                    self.collisions += 1
+                obstacle.touching = True
+            elif (new_gap > CONTACT_DISTANCE):
+                obstacle.touching = False
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function drives the automatic mode around the simulated track.
+#
+# INPUT PARAMETERS:
+#   laps - the number of timed laps to drive
+#   speed - the automatic mode speed
+#   follower - the track follower to use, or None for plain line following
+#   segments - the track
+#   obstacles - the obstacles, each a position in cm, the lap it is put
+#               down on and how many seconds it stays, None for good
+#   max_lap_time - the average lap time at which the run is given up
+#   late_ticks - the fraction of control ticks that run late, each by up to
+#                MAX_OVERRUN_TICKS ticks, like the car under web server load
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the track world at the end, with the lap times, the collisions, the
+#   time spent blocked by obstacles and whether it crashed
+# -----------------------------------------------------------------------------
+
+
+def run_laps(laps, speed, follower=None, segments=OVAL_TRACK, obstacles=(),
+             max_lap_time=MAX_LAP_TIME, late_ticks=0.0):
+    world = TrackWorld(segments, obstacles)
+    sim_gpio.cleanup()
+    project.setup_gpio()
+    project.global_state.update(mode="automatic", speed=speed,
+                                avoiding_object=False, estop_latched=False)
+    project.global_track_follower = follower
+    sim_gpio.set_input_source(world.input)
+    tick = project.CONTROL_TICK_PERIOD
+    max_time = (laps + 1) * max_lap_time
+    next_distance = 0.0
+    late = random.Random(0)
+    try:
+        while (len(world.lap_times) < laps and not world.crashed and
+               world.t < max_time):
+            if (project.OBSTACLE_AVOIDANCE and world.t >= next_distance):
+                project.avoid_obstacle(world.distance())
+                next_distance += project.ULTRASONIC_PERIOD
+            project.automatic_step(world.t)
+            ticks = 1
+            if (late_ticks > 0 and late.random() < late_ticks):
+                ticks += late.randint(1, MAX_OVERRUN_TICKS)
+            if (project.global_state.current.avoiding_object or
+                    world.stuck()):
+                world.blocked_time += ticks * tick
+            for i in range(ticks):
+                world.step(tick)
+    finally:
+        sim_gpio.set_input_source(None)
+        project.global_track_follower = None
+    return world
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function prints the lap times of a simulated run.
+#
+# INPUT PARAMETERS:
+#   name - the name of the run
+#   world - the track world at the end of the run
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def print_laps(name, world):
+    laps = " ".join("%.2f" % lap for lap in world.lap_times)
+    print("%-10s laps: %s s%s" % (name, laps,
+                                  " (crashed)" if world.crashed else ""))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that compares plain line following with the
+#   learned track map on the simulated track.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare lap times on the simulated track.")
+    parser.add_argument("--laps", type=int, default=5)
+    parser.add_argument("--speed", type=int, default=60)
+    parser.add_argument("--map", default=None,
+                        help="where to cache the learned map")
+    parser.add_argument("--late-ticks", type=float, default=0.0,
+                        help="fraction of control ticks that run late")
+    args = parser.parse_args()
+
+    print_laps("reactive", run_laps(args.laps, args.speed,
+                                    late_ticks=args.late_ticks))
+    follower = TrackFollower(args.map, project.CONTROL_TICK_PERIOD)
+    print_laps("learned", run_laps(args.laps, args.speed, follower,
+                                   late_ticks=args.late_ticks))
+    if (follower.track_map is not None):
+        print("map:       %s" % " ".join(
+            "%s %.2f" % (kind, length)
+            for kind, length in follower.track_map.segments))
+
+
+# if file execute standalone then call the main function.
+if __name__ == '__main__':
+    main()
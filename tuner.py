@@ -0,0 +1,245 @@
+# *****************************************************************************
+# ***************************  Python Source Code  ****************************
+# *****************************************************************************
+#
+#   DESIGNER NAME:  Kushal Timsina & Soban Mahmud
+#
+#       FILE NAME:  tuner.py
+#
+# DESCRIPTION
+#    This code tunes the automatic mode settings on the simulated tracks of
+#    track_sim.py instead of by trial and error on the car. Every setting
+#    (speed, PWM frequency, obstacle distance and how hard the car steers)
+#    is driven around each scenario, a track with obstacles on it, and the
+#    settings are ranked by collisions and then lap time. The runs are spread
+#    over a process pool using every core.
+#
+#    The best settings are written to the config file project.py loads at
+#    start:
+#
+#        python tuner.py --search random --samples 200
+#        python tuner.py --search grid
+#
+# NOTES
+#    Settings that run off the track or don't finish their laps on any
+#    scenario rank last. A too large UV_MAXIMUM_DISTANCE does that, the car
+#    sees the wall past each turn as an obstacle and never gets around it.
+#
+#    The obstacles stay on the track for a set time whatever the car does,
+#    and the car can't drive through them. Waiting for one to go away and
+#    being stuck against one both take time. So a collision never saves
+#    time, and it only shows up in the collision count and the blocked time.
+#
+# *****************************************************************************
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import track_sim
+import project
+
+# The values searched for each setting
+SPEEDS = (40, 50, 60, 70, 80, 90, 100)
+PWM_FREQUENCIES = (50, 100, 200, 500, 1000)
+UV_MAXIMUM_DISTANCES = (3, 5, 7, 10, 14, 20)
+STEER_INNER_RATIOS = (0.0, 0.2, 0.4, 0.6)
+
+# Each scenario is a track and its obstacles, a position in cm, the lap the
+# obstacle is put down on and how many seconds it stays.
+SCENARIOS = (
+    ("oval", track_sim.OVAL_TRACK, ((60.0, 1, 4.0), (120.0, 2, 4.0))),
+    ("square", track_sim.SQUARE_TRACK, ((30.0, 1, 3.0), (120.0, 2, 3.0))),
+)
+LAPS = 2
+MAX_LAP_TIME = 40.0  # s
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function makes the settings to try.
+#
+# INPUT PARAMETERS:
+#   search - "grid" for every combination, "random" for a random sample
+#   samples - how many settings a random search tries
+#   seed - the random seed
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a list of settings dictionaries with the project.CONFIG_KEYS keys
+# -----------------------------------------------------------------------------
+
+
+def make_settings(search, samples, seed):
+    grid = [{"speed": speed, "pwm_frequency": frequency,
+             "uv_maximum_distance": distance, "steer_inner_ratio": ratio,
+             "obstacle_avoidance": True}
+            for speed, frequency, distance, ratio in itertools.product(
+                SPEEDS, PWM_FREQUENCIES, UV_MAXIMUM_DISTANCES,
+                STEER_INNER_RATIOS)]
+    if (search == "grid" or samples >= len(grid)):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function drives one set of settings around every scenario. It runs
+#   in the pool processes, each with its own copy of project.py.
+#
+# INPUT PARAMETERS:
+#   settings - the settings dictionary
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   a tuple of the settings, whether every scenario finished, the number of
+#   collisions, the average lap time and the total time blocked by obstacles
+# -----------------------------------------------------------------------------
+
+
+def evaluate(settings):
+    project.PWM_FREQUENCY = settings["pwm_frequency"]
+    project.UV_MAXIMUM_DISTANCE = settings["uv_maximum_distance"]
+    project.STEER_INNER_RATIO = settings["steer_inner_ratio"]
+    project.OBSTACLE_AVOIDANCE = settings["obstacle_avoidance"]
+    finished = True
+    collisions = 0
+    blocked = 0.0
+    lap_times = []
+    for name, segments, obstacles in SCENARIOS:
+        world = track_sim.run_laps(LAPS, settings["speed"],
+                                   segments=segments, obstacles=obstacles,
+                                   max_lap_time=MAX_LAP_TIME)
+        if (world.crashed or len(world.lap_times) < LAPS):
+            finished = False
+        collisions += world.collisions
+        blocked += world.blocked_time
+        lap_times += world.lap_times
+    average = sum(lap_times) / len(lap_times) if lap_times else float("inf")
+    return settings, finished, collisions, average, blocked
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function is the ranking key of a result. Finishing every scenario
+#   comes first, then fewer collisions, then a shorter lap time, then less
+#   time blocked by obstacles.
+#
+# INPUT PARAMETERS:
+#   result - a result from evaluate
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the sort key
+# -----------------------------------------------------------------------------
+
+
+def rank_key(result):
+    settings, finished, collisions, average, blocked = result
+    return (not finished, collisions, average, blocked)
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function tries every setting over a process pool.
+#
+# INPUT PARAMETERS:
+#   settings - the list of settings to try
+#   workers - the number of processes, None for one per core
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   the results, best first
+# -----------------------------------------------------------------------------
+
+
+def tune(settings, workers=None):
+    with multiprocessing.Pool(workers) as pool:
+        chunk = max(1, len(settings) // (4 * (workers or os.cpu_count())))
+        results = list(pool.imap_unordered(evaluate, settings, chunk))
+    results.sort(key=rank_key)
+    return results
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This function prints the best results.
+#
+# INPUT PARAMETERS:
+#   results - the results, best first
+#   count - how many to print
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def print_results(results, count):
+    print("rank speed   pwm Hz  uv cm  inner  collisions  blocked s  lap s")
+    for rank, (settings, finished, collisions, average, blocked) in \
+            enumerate(results[:count], 1):
+        print("%4d %5d %8d %6g %6.1f %11d %10.2f  %s" % (
+            rank, settings["speed"], settings["pwm_frequency"],
+            settings["uv_maximum_distance"], settings["steer_inner_ratio"],
+            collisions, blocked,
+            "%.2f" % average if finished else "did not finish"))
+
+# -----------------------------------------------------------------------------
+# DESCRIPTION
+#   This is the main function that tunes the settings and writes the best
+#   ones to the config file.
+#
+# INPUT PARAMETERS:
+#   none
+#
+# OUTPUT PARAMETERS:
+#   none
+#
+# RETURN:
+#   none
+# -----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tune the automatic mode settings on the simulator.")
+    parser.add_argument("--search", choices=("grid", "random"),
+                        default="random")
+    parser.add_argument("--samples", type=int, default=200,
+                        help="settings to try in a random search")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes, one per core by default")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=project.CONFIG_PATH)
+    args = parser.parse_args()
+
+    settings = make_settings(args.search, args.samples, args.seed)
+    start = time.perf_counter()
+    results = tune(settings, args.workers)
+    elapsed = time.perf_counter() - start
+    print("Tried %d settings in %.1f s" % (len(settings), elapsed))
+    print_results(results, args.top)
+
+    best, finished, collisions, average, blocked = results[0]
+    if (not finished):
+        print("No settings finished every scenario, nothing written")
+        return
+    with open(args.output, "w") as file:
+        json.dump(best, file, indent=2)
+    print("Wrote %s" % args.output)
+
+
+# if file execute standalone then call the main function.
+if __name__ == '__main__':
+    main()